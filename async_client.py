@@ -0,0 +1,177 @@
+import asyncio
+import socket
+import time
+from typing import List, Optional
+import communication
+import dummy_bot
+
+
+class ClientProtocol(asyncio.DatagramProtocol):
+	def __init__(self, on_datagram):
+		self.on_datagram = on_datagram
+		self.transport = None
+
+	def connection_made(self, transport):
+		self.transport = transport
+
+	def datagram_received(self, data, addr):
+		self.on_datagram(data)
+
+	def error_received(self, exc):
+		print(f"client: {exc}")
+
+
+class TransportSocket:
+	"""
+	Socket-like send for code written against connected sockets, e.g. dummy_bot.Bot.
+	"""
+
+	def __init__(self, transport):
+		self.transport = transport
+
+	def send(self, data):
+		self.transport.sendto(data)
+		return len(data)
+
+
+async def open_endpoint(server_host, server_port, on_datagram, ip_ver=socket.AF_INET):
+	loop = asyncio.get_running_loop()
+	return await loop.create_datagram_endpoint(lambda: ClientProtocol(on_datagram),
+											   remote_addr=(server_host, server_port), family=ip_ver)
+
+
+class AsyncClient:
+	"""
+	asyncio counterpart of tests_200.Client, received messages are queued by the event loop.
+	"""
+
+	def __init__(self, session_id, player_name):
+		self.session_id = session_id
+		self.player_name = player_name
+		self.encoder = communication.CtsEncoder(session_id, player_name)
+		self.messages = asyncio.Queue()
+		self.transport = None
+
+	@classmethod
+	async def connect(cls, server_host, server_port, session_id, player_name, ip_ver=socket.AF_INET):
+		client = cls(session_id, player_name)
+		client.transport, _ = await open_endpoint(server_host, server_port, client.messages.put_nowait, ip_ver)
+		return client
+
+	def send_message(self, turn_direction, next_expected_event_no=0):
+		self.transport.sendto(self.encoder.encode(turn_direction, next_expected_event_no))
+
+	async def recv_message(self, timeout=None) -> Optional[communication.ServerMessage]:
+		try:
+			b_message = await asyncio.wait_for(self.messages.get(), timeout)
+		except asyncio.TimeoutError:
+			return None
+		return communication.deserialize_stc_message(b_message)
+
+	def pull_events(self) -> List[communication.ServerMessage]:
+		server_messages = []
+		while not self.messages.empty():
+			server_messages.append(communication.deserialize_stc_message(self.messages.get_nowait()))
+		return server_messages
+
+	def close(self):
+		self.transport.close()
+
+
+async def create_bot(server_host, server_port, session_id, name, strategy="right", interval_s=0.03,
+					 rounds_per_sec=None):
+	"""
+	dummy_bot.Bot driven by the event loop instead of epoll and timerfd.
+	"""
+	bot = dummy_bot.Bot(None, session_id, name, strategy, interval_s, rounds_per_sec=rounds_per_sec)
+	transport, _ = await open_endpoint(server_host, server_port, bot.on_datagram)
+	bot.sock = TransportSocket(transport)
+	return bot
+
+
+async def run_bot(bot):
+	while True:
+		bot.on_tick(time.monotonic())
+		await asyncio.sleep(bot.interval_s)
+
+
+class GuiMockServer:
+	"""
+	asyncio counterpart of gui_mock.py, prints client lines and sends a key to every client periodically.
+	"""
+
+	def __init__(self, key_interval_s=1.0, key=b"LEFT_KEY_DOWN\n"):
+		self.key_interval_s = key_interval_s
+		self.key = key
+		self.writers = set()
+
+	async def handle_client(self, reader, writer):
+		addr = writer.get_extra_info("peername")
+		print(f"new client {addr[0]}:{addr[1]}")
+		self.writers.add(writer)
+		try:
+			while True:
+				line = await reader.readline()
+				if not line:
+					break
+				print(f"client data: {line}")
+		finally:
+			self.writers.discard(writer)
+			writer.close()
+			print("connection closed")
+
+	async def send_keys(self):
+		while True:
+			await asyncio.sleep(self.key_interval_s)
+			for writer in self.writers:
+				writer.write(self.key)
+
+	async def serve(self, port):
+		server = await asyncio.start_server(self.handle_client, port=port, family=socket.AF_INET)
+		print(f"listening at port {server.sockets[0].getsockname()[1]}")
+		async with server:
+			await asyncio.gather(server.serve_forever(), self.send_keys())
+
+
+async def report_stats(stats, interval_s=1.0):
+	while True:
+		await asyncio.sleep(interval_s)
+		print(stats)
+
+
+def init_parser():
+	parser = dummy_bot.init_parser()
+	parser.add_argument("-g", "--gui-port", default=None, help="also run GUI mock server at this port")
+	parser.add_argument("-d", "--duration", default=None, type=float, help="seconds to run, forever if not set")
+
+	return parser
+
+
+async def main(args):
+	strategies = args.strategy.split(",")
+	intervals = [float(i) / 1000.0 for i in args.interval.split(",")]
+
+	bots = []
+	for i in range(args.bots + args.observers):
+		name = f"{args.name}{i}" if i < args.bots else ""
+		bots.append(await create_bot(args.addr, int(args.port), args.session + i, name,
+									 strategies[i % len(strategies)], intervals[i % len(intervals)], args.rounds_per_sec))
+
+	stats = dummy_bot.SwarmStats(bots)
+	tasks = [run_bot(bot) for bot in bots]
+	tasks.append(report_stats(stats))
+	if args.gui_port is not None:
+		tasks.append(GuiMockServer().serve(int(args.gui_port)))
+
+	try:
+		await asyncio.wait_for(asyncio.gather(*tasks), args.duration)
+	except asyncio.TimeoutError:
+		pass
+	print(stats.sessions())
+
+
+if __name__ == '__main__':
+	try:
+		asyncio.run(main(init_parser().parse_args()))
+	except KeyboardInterrupt:
+		pass
@@ -0,0 +1,223 @@
+import argparse
+import json
+import time
+import tracemalloc
+import communication
+
+MAX_PLAYERS = 25
+MAX_NAME_LEN = 20
+
+
+def pixel_events(n, first_event_no=1):
+	return [communication.Event(-1, i, 1, communication.DataPixel(i % 25, i % 2048, i % 1024), -1)
+			for i in range(first_event_no, first_event_no + n)]
+
+
+def mixed_events(n, first_event_no=1):
+	"""
+	PIXEL events with a PLAYER_ELIMINATED every third event, ending with GAME_OVER.
+	"""
+	events = []
+	for i in range(first_event_no, first_event_no + n - 1):
+		if i % 3 == 0:
+			events.append(communication.Event(-1, i, 2, communication.DataPlayerEliminated(i % 25), -1))
+		else:
+			events.append(communication.Event(-1, i, 1, communication.DataPixel(i % 25, i % 2048, i % 1024), -1))
+	events.append(communication.Event(-1, first_event_no + n - 1, 3, None, -1))
+	return events
+
+
+def pack_datagram(events, game_id=777):
+	"""
+	Pack leading events into one server to client datagram of at most 550 bytes.
+	:return: (datagram, number of events)
+	"""
+	buffer = bytearray(communication.MAX_STC_MESSAGE_LEN)
+	length, n_events = communication.pack_stc_events_into(buffer, game_id, events)
+	return bytes(buffer[:length]), n_events
+
+
+def pixel_datagram(game_id=777, first_event_no=1):
+	return pack_datagram(pixel_events(100, first_event_no), game_id)
+
+
+def new_game_datagram(game_id=777):
+	"""
+	NEW_GAME of 25 players with 20 character names, exactly 550 bytes.
+	"""
+	names = [f"{i:02d}".ljust(MAX_NAME_LEN, "x") for i in range(MAX_PLAYERS)]
+	event = communication.Event(-1, 0, 0, communication.DataNewGame(2048, 2048, names), -1)
+	return pack_datagram([event], game_id)
+
+
+def mixed_datagram(game_id=777):
+	events = mixed_events(28)
+	datagram, n_events = pack_datagram(events, game_id)
+	if n_events < len(events):
+		raise ValueError("mixed events do not fit in one datagram")
+	return datagram, n_events
+
+
+DATAGRAMS = {
+	"pixel": pixel_datagram,
+	"new_game": new_game_datagram,
+	"mixed": mixed_datagram,
+}
+
+
+def measure(fn, duration):
+	"""
+	Call fn repeatedly for about duration seconds.
+	:return: seconds per call
+	"""
+	calls = 0
+	start = time.perf_counter()
+	now = start
+	while now - start < duration:
+		for _ in range(100):
+			fn()
+		calls += 100
+		now = time.perf_counter()
+	return (now - start) / calls
+
+
+def allocations(fn, calls=100):
+	"""
+	Memory use of fn measured with tracemalloc, results of all calls are kept alive.
+	:return: (memory blocks retained per call, peak bytes allocated per call)
+	"""
+	results = []
+	fn()  # Warm up caches, e.g. struct and str interning.
+	tracemalloc.start()
+	try:
+		before = tracemalloc.take_snapshot()
+		tracemalloc.reset_peak()
+		start_size, _ = tracemalloc.get_traced_memory()
+		for _ in range(calls):
+			results.append(fn())
+		_, peak = tracemalloc.get_traced_memory()
+		after = tracemalloc.take_snapshot()
+	finally:
+		tracemalloc.stop()
+	blocks = sum(s.count_diff for s in after.compare_to(before, "filename"))
+	return blocks / calls, (peak - start_size) / calls
+
+
+def benchmarks():
+	"""
+	:return: list of (name, function, units per call, unit)
+	"""
+	result = []
+	for name, make_datagram in DATAGRAMS.items():
+		b_message, n_events = make_datagram()
+
+		def batch_extend(b=b_message):
+			batch = communication.EventBatch()
+			batch.extend_from_message(b)
+			return batch
+
+		result += [
+			(f"deserialize_stc_message[{name}]",
+			 lambda b=b_message: communication.deserialize_stc_message(b), n_events, "event"),
+			(f"deserialize_stc_message_strict[{name}]",
+			 lambda b=b_message: communication.deserialize_stc_message(b, strict=True), n_events, "event"),
+			(f"deserialize_stc_message_lazy[{name}]",
+			 lambda b=b_message: communication.deserialize_stc_message(b, lazy=True), n_events, "event"),
+			(f"check_stc_message[{name}]", lambda b=b_message: communication.check_stc_message(b), n_events, "event"),
+			(f"EventBatch.extend_from_message[{name}]", batch_extend, n_events, "event"),
+		]
+
+	b_new_game = new_game_datagram()[0][13:-4]
+	b_pixel = pixel_datagram()[0][13:22]
+	b_player_eliminated = bytes([7])
+	result += [
+		("deserialize_stc_message_new_game",
+		 lambda: communication.deserialize_stc_message_new_game(b_new_game), 1, "event"),
+		("deserialize_stc_message_pixel", lambda: communication.deserialize_stc_message_pixel(b_pixel), 1, "event"),
+		("deserialize_stc_message_player_eliminated",
+		 lambda: communication.deserialize_stc_message_player_eliminated(b_player_eliminated), 1, "event"),
+	]
+
+	encoder = communication.CtsEncoder(1234567890123, "abcdefghijklmnopqrst")
+	events = pixel_events(1000)
+	buffer = bytearray(communication.MAX_STC_MESSAGE_LEN)
+
+	def pack_all():
+		i = 0
+		while i < len(events):
+			length, i = communication.pack_stc_events_into(buffer, 777, events, i)
+
+	result += [
+		("serialize_cts_message",
+		 lambda: communication.serialize_cts_message(1234567890123, 1, 12345, "abcdefghijklmnopqrst"), 1, "message"),
+		("CtsEncoder.encode", lambda: encoder.encode(1, 12345), 1, "message"),
+		("pack_stc_events_into", pack_all, len(events), "event"),
+		("pack_stc_events", lambda: communication.pack_stc_events(777, events), len(events), "event"),
+	]
+	return result
+
+
+def run(selected, duration):
+	"""
+	:param selected: substrings of benchmark names to run, all if empty
+	:return: benchmark name -> {"ns": ns per unit, "unit", "blocks": blocks per call, "bytes": peak bytes per call}
+	"""
+	results = {}
+	for name, fn, units, unit in benchmarks():
+		if selected and not any(s in name for s in selected):
+			continue
+		ns = measure(fn, duration) * 1e9 / units
+		blocks, peak = allocations(fn)
+		results[name] = {"ns": ns, "unit": unit, "blocks": blocks, "bytes": peak}
+		print(f"{name:55} {ns:8.0f} ns/{unit:7} {blocks:6.1f} blocks/call {peak:8.0f} B peak/call")
+	return results
+
+
+def compare(results, baseline, threshold):
+	"""
+	Print timing and allocation changes against a baseline.
+	:param threshold: relative slowdown reported as a regression, e.g. 0.1 for 10%
+	:return: names of regressed benchmarks
+	"""
+	regressions = []
+	for name, result in results.items():
+		if name not in baseline:
+			continue
+		base = baseline[name]
+		change = result["ns"] / base["ns"] - 1.0
+		regressed = change > threshold or result["blocks"] > base["blocks"] + 0.5
+		if regressed:
+			regressions.append(name)
+		print(f"{name:55} {base['ns']:8.0f} -> {result['ns']:8.0f} ns ({change:+6.1%}) "
+			  f"blocks {base['blocks']:.1f} -> {result['blocks']:.1f}{'  REGRESSION' if regressed else ''}")
+	return regressions
+
+
+def init_parser():
+	parser = argparse.ArgumentParser()
+	parser.add_argument("-d", "--duration", default=1.0, type=float, help="seconds per benchmark")
+	parser.add_argument("-k", "--select", action="append", default=[],
+						help="run only benchmarks with this substring in the name, may be repeated")
+	parser.add_argument("--save", default=None, help="save results as JSON baseline")
+	parser.add_argument("--compare", default=None, help="compare with JSON baseline, exit 1 on regression")
+	parser.add_argument("-t", "--threshold", default=0.1, type=float, help="relative slowdown counted as regression")
+
+	return parser
+
+
+if __name__ == '__main__':
+	args = init_parser().parse_args()
+
+	results = run(args.select, args.duration)
+
+	if args.save is not None:
+		with open(args.save, "w") as f:
+			json.dump(results, f, indent=1)
+
+	if args.compare is not None:
+		with open(args.compare) as f:
+			baseline = json.load(f)
+		print("-" * 70)
+		regressions = compare(results, baseline, args.threshold)
+		print("OK" if not regressions else f"{len(regressions)} regressions")
+		exit(1 if regressions else 0)
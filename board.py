@@ -0,0 +1,164 @@
+from typing import List
+import communication
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+
+class Board:
+	"""
+	Client-side model of one game built from its in-order events, collecting every inconsistency found:
+	event numbering gaps or repeats, pixels outside the board, repeated pixels, moves of eliminated
+	players, repeated eliminations and GAME_OVER with other than one player left.
+	Whether an elimination was caused by a collision cannot be told from the events alone.
+	"""
+
+	def __init__(self, new_game: communication.DataNewGame):
+		self.max_x = new_game.max_x
+		self.max_y = new_game.max_y
+		self.players_names = new_game.players_names
+		self.occupied = bytearray(self.max_x * self.max_y)
+		self.eliminated = bytearray(len(self.players_names))
+		self.alive_count = len(self.players_names)
+		self.next_event_no = 1
+		self.over = False
+		self.errors: List[str] = []
+
+	def apply(self, event):
+		"""
+		Apply one event following NEW_GAME.
+		"""
+		if event.event_no != self.next_event_no:
+			self.errors.append(f"event {event.event_no}: expected event_no {self.next_event_no}")
+		self.next_event_no = event.event_no + 1
+		if self.over:
+			self.errors.append(f"event {event.event_no}: event after GAME_OVER")
+
+		if event.event_type == 1:
+			self.apply_pixel(event.event_no, event.event_data.player_num, event.event_data.x, event.event_data.y)
+		elif event.event_type == 2:
+			self.apply_player_eliminated(event.event_no, event.event_data.player_num)
+		elif event.event_type == 3:
+			if self.alive_count != 1:
+				self.errors.append(f"event {event.event_no}: GAME_OVER with {self.alive_count} players left")
+			self.over = True
+		else:
+			self.errors.append(f"event {event.event_no}: unexpected event_type={event.event_type}")
+
+	def apply_pixel(self, event_no, player_num, x, y):
+		if player_num >= len(self.players_names):
+			self.errors.append(f"event {event_no}: PIXEL of unknown player {player_num}")
+		elif self.eliminated[player_num]:
+			self.errors.append(f"event {event_no}: PIXEL of eliminated player {player_num}")
+		if x < 0 or y < 0 or x >= self.max_x or y >= self.max_y:
+			self.errors.append(f"event {event_no}: PIXEL ({x}, {y}) outside the board")
+			return
+		i = y * self.max_x + x
+		if self.occupied[i]:
+			self.errors.append(f"event {event_no}: PIXEL ({x}, {y}) already eaten")
+		self.occupied[i] = 1
+
+	def apply_player_eliminated(self, event_no, player_num):
+		if player_num >= len(self.players_names):
+			self.errors.append(f"event {event_no}: PLAYER_ELIMINATED of unknown player {player_num}")
+		elif self.eliminated[player_num]:
+			self.errors.append(f"event {event_no}: player {player_num} eliminated again")
+		else:
+			self.eliminated[player_num] = 1
+			self.alive_count -= 1
+
+	def apply_batch(self, batch: communication.EventBatch, start=0, end=None):
+		"""
+		Apply rows [start, end) of the batch, vectorized when numpy is installed.
+		"""
+		if end is None:
+			end = len(batch)
+		if numpy is None:
+			for i in range(start, end):
+				self.apply(batch.event(i))
+		else:
+			self.apply_columns({name: c[start:end] for name, c in batch.to_numpy().items()})
+
+	def apply_columns(self, columns):
+		event_no = columns["event_no"].astype(numpy.int64)
+		event_type = columns["event_type"]
+		player_num = columns["player_num"].astype(numpy.int64)
+		x = columns["x"].astype(numpy.int64)
+		y = columns["y"].astype(numpy.int64)
+		if len(event_no) == 0:
+			return
+		n_players = len(self.players_names)
+
+		# Every event should follow the previous one, as in apply().
+		expected_no = numpy.concatenate(([self.next_event_no], event_no[:-1] + 1))
+		for i in numpy.flatnonzero(event_no != expected_no):
+			self.errors.append(f"event {event_no[i]}: expected event_no {expected_no[i]}")
+		self.next_event_no = int(event_no[-1]) + 1
+
+		# Every event after GAME_OVER is reported, as in apply().
+		game_over = numpy.flatnonzero(event_type == 3)
+		after = 0 if self.over else game_over[0] + 1 if len(game_over) else len(event_no)
+		for i in range(after, len(event_no)):
+			self.errors.append(f"event {event_no[i]}: event after GAME_OVER")
+		for i in numpy.flatnonzero((event_type == 0) | (event_type > 3)):
+			self.errors.append(f"event {event_no[i]}: unexpected event_type={event_type[i]}")
+
+		rows = numpy.arange(len(event_no))
+		pixels = event_type == 1
+		eliminations = event_type == 2
+		for i in numpy.flatnonzero((pixels | eliminations) & (player_num >= n_players)):
+			kind = "PIXEL" if pixels[i] else "PLAYER_ELIMINATED"
+			self.errors.append(f"event {event_no[i]}: {kind} of unknown player {player_num[i]}")
+		known = player_num < n_players
+
+		# Row of the first elimination of each player, -1 if eliminated before this batch.
+		eliminated_at = numpy.where(numpy.frombuffer(self.eliminated, dtype=numpy.uint8) != 0, -1, len(rows))
+		elim_rows = rows[eliminations & known]
+		elim_players = player_num[elim_rows]
+		first_elim = numpy.full(n_players, len(rows))
+		numpy.minimum.at(first_elim, elim_players, elim_rows)
+		eliminated_at = numpy.minimum(eliminated_at, first_elim)
+
+		for i in elim_rows[elim_rows > eliminated_at[elim_players]]:
+			self.errors.append(f"event {event_no[i]}: player {player_num[i]} eliminated again")
+		moving = rows[pixels & known]
+		for i in moving[moving > eliminated_at[player_num[moving]]]:
+			self.errors.append(f"event {event_no[i]}: PIXEL of eliminated player {player_num[i]}")
+
+		inside = pixels & (x < self.max_x) & (y < self.max_y)
+		for i in numpy.flatnonzero(pixels & ~inside):
+			self.errors.append(f"event {event_no[i]}: PIXEL ({x[i]}, {y[i]}) outside the board")
+		index = y[inside] * self.max_x + x[inside]
+		occupied = numpy.frombuffer(self.occupied, dtype=numpy.uint8)
+		# Stable sort keeps the first visit of a pixel before its repeats.
+		order = numpy.argsort(index, kind="stable")
+		repeated = occupied[index] != 0
+		repeated[order[1:][index[order[1:]] == index[order[:-1]]]] = True
+		for i in rows[inside][repeated]:
+			self.errors.append(f"event {event_no[i]}: PIXEL ({x[i]}, {y[i]}) already eaten")
+		occupied[index] = 1
+
+		self.eliminated = bytearray((eliminated_at < len(rows)).astype(numpy.uint8).tobytes())
+		self.alive_count = n_players - int(numpy.count_nonzero(eliminated_at < len(rows)))
+
+		for i in game_over:
+			alive = n_players - int(numpy.count_nonzero(eliminated_at <= i))
+			if alive != 1:
+				self.errors.append(f"event {event_no[i]}: GAME_OVER with {alive} players left")
+			self.over = True
+
+
+def validate_game(batch: communication.EventBatch) -> List[str]:
+	"""
+	Check a whole game stored in event_no order, starting with NEW_GAME.
+	:return: descriptions of inconsistencies, empty for a consistent game
+	"""
+	if len(batch) == 0 or batch.event_type[0] != 0:
+		return ["game does not start with NEW_GAME"]
+	if batch.event_no[0] != 0:
+		return [f"NEW_GAME has event_no {batch.event_no[0]}"]
+	board = Board(batch.new_games[0])
+	board.apply_batch(batch, 1)
+	return board.errors
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+import argparse
+import mmap
+import socket
+import struct
+import time
+from typing import Iterator, Tuple
+import communication
+
+# File starts with MAGIC, then records of _RECORD header (nanoseconds since capture start, length)
+# followed by the raw datagram.
+MAGIC = b"SWCAP01\n"
+_RECORD = struct.Struct("!QH")
+
+
+class CaptureWriter:
+	"""
+	Appends received server datagrams with timestamps to a capture file.
+	"""
+
+	def __init__(self, path):
+		self.file = open(path, "wb")
+		self.file.write(MAGIC)
+		self.start_ns = time.monotonic_ns()
+		self.datagrams = 0
+
+	def write(self, datagram):
+		self.file.write(_RECORD.pack(time.monotonic_ns() - self.start_ns, len(datagram)))
+		self.file.write(datagram)
+		self.datagrams += 1
+
+	def close(self):
+		self.file.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_val, exc_tb):
+		self.close()
+
+
+class CaptureReader:
+	"""
+	Memory-mapped capture file, datagrams are memoryviews into the mapping.
+	"""
+
+	def __init__(self, path):
+		with open(path, "rb") as f:
+			self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		self.view = memoryview(self.mmap)
+		if self.view[:len(MAGIC)] != MAGIC:
+			self.close()
+			raise ValueError(f"{path} is not a capture file")
+
+	def __iter__(self) -> Iterator[Tuple[float, memoryview]]:
+		"""
+		:return: (seconds since capture start, datagram) pairs
+		"""
+		offset = len(MAGIC)
+		end = len(self.view)
+		while offset + _RECORD.size <= end:
+			t_ns, length = _RECORD.unpack_from(self.view, offset)
+			offset += _RECORD.size
+			if offset + length > end:
+				break  # Truncated last record, e.g. capture interrupted while writing.
+			yield t_ns / 1e9, self.view[offset:offset + length]
+			offset += length
+
+	def close(self):
+		self.view.release()
+		try:
+			self.mmap.close()
+		except BufferError:
+			pass  # Datagram views are still in use, the mapping is unmapped when they are freed.
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_val, exc_tb):
+		self.close()
+
+
+def replay(reader: CaptureReader, port, fast=False, timeout=None):
+	"""
+	Act as the server: wait for the first datagram of a client at port, then send it the captured datagrams.
+	:param fast: send as fast as possible instead of at the captured timing
+	:param timeout: seconds to wait for the client, forever if None
+	:return: (datagrams sent, seconds spent sending)
+	"""
+	sock = socket.socket(socket.AF_INET6, socket.SOCK_DGRAM)
+	sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 0)
+	sock.bind(("::", port))
+	sock.settimeout(timeout)
+	try:
+		_, client_addr = sock.recvfrom(communication.RECV_BUFFER_SIZE)
+	finally:
+		sock.settimeout(None)
+
+	sent = 0
+	start = time.monotonic()
+	first_t = None
+	for t, datagram in reader:
+		if not fast:
+			if first_t is None:
+				first_t = t
+			delay = start + (t - first_t) - time.monotonic()
+			if delay > 0:
+				time.sleep(delay)
+		sock.sendto(datagram, client_addr)
+		sent += 1
+	elapsed = time.monotonic() - start
+	sock.close()
+	return sent, elapsed
+
+
+def init_parser():
+	parser = argparse.ArgumentParser(description="inspect or replay datagram capture files")
+	parser.add_argument("capture", help="capture file")
+	parser.add_argument("-p", "--port", default=None, type=int,
+						help="replay to the first client that sends a datagram to this port")
+	parser.add_argument("-f", "--fast", action="store_true", help="replay as fast as possible")
+
+	return parser
+
+
+if __name__ == '__main__':
+	args = init_parser().parse_args()
+
+	with CaptureReader(args.capture) as reader:
+		if args.port is None:
+			count = 0
+			total = 0
+			last_t = 0.0
+			for t, datagram in reader:
+				count += 1
+				total += len(datagram)
+				last_t = t
+			print(f"{count} datagrams, {total} bytes, {last_t:.3f}s")
+		else:
+			print(f"waiting for client at port {args.port}")
+			sent, elapsed = replay(reader, args.port, args.fast)
+			print(f"sent {sent} datagrams in {elapsed:.3f}s ({sent / max(elapsed, 1e-9):.0f}/s)")
@@ -1,19 +1,74 @@
 import struct
+import zlib
+from array import array
 from dataclasses import dataclass, field
-from typing import List, Union
+from typing import Iterator, List, NamedTuple, Optional, Tuple, Union
+
+# Server datagrams have at most 550 bytes, anything bigger is not a valid message.
+MAX_STC_MESSAGE_LEN = 550
+RECV_BUFFER_SIZE = 1024
+
+
+_CTS_HEADER = struct.Struct("!QBI")
+_CTS_FIELDS = struct.Struct("!BI")
+_CTS_FIELDS_OFFSET = 8
 
 
 def serialize_cts_message(session_id, turn_direction, next_expected_event_no, player_name):
 	"""
 	Return client to server message as bytes array.
 	"""
-	name_bytes = str.encode(player_name)
-	name_len = len(name_bytes)
-	return struct.pack(f"!QBI{name_len}s", session_id, turn_direction, next_expected_event_no, name_bytes)
+	return _CTS_HEADER.pack(session_id, turn_direction, next_expected_event_no) + str.encode(player_name)
+
+
+class CtsEncoder:
+	"""
+	Client to server message encoder of one session. session_id and player_name are
+	encoded once into a preallocated buffer, encode only writes the changing fields.
+	"""
+	__slots__ = ("session_id", "player_name", "buffer", "view")
+
+	def __init__(self, session_id, player_name):
+		self.session_id = session_id
+		self.player_name = player_name
+
+		name_bytes = str.encode(player_name)
+		self.buffer = bytearray(_CTS_HEADER.size + len(name_bytes))
+		_CTS_HEADER.pack_into(self.buffer, 0, session_id, 0, 0)
+		self.buffer[_CTS_HEADER.size:] = name_bytes
+		self.view = memoryview(self.buffer)
+
+	def encode(self, turn_direction, next_expected_event_no) -> memoryview:
+		"""
+		Return client to server message, valid until the next encode call.
+		"""
+		_CTS_FIELDS.pack_into(self.buffer, _CTS_FIELDS_OFFSET, turn_direction, next_expected_event_no)
+		return self.view
+
+
+def send_cts_messages(sends) -> List[Tuple[int, str]]:
+	"""
+	Encode and send client to server messages of many sessions in one call.
+	Python has no sendmmsg binding, so this is a tight send loop over preallocated buffers.
+	A failed send does not stop the others.
+	:param sends: iterable of (connected socket, CtsEncoder, turn_direction, next_expected_event_no)
+	:return: (index in sends, error description) of messages that were not fully sent
+	"""
+	failed = []
+	for i, (sock, encoder, turn_direction, next_expected_event_no) in enumerate(sends):
+		m_client = encoder.encode(turn_direction, next_expected_event_no)
+		try:
+			if sock.send(m_client) != len(m_client):
+				failed.append((i, "partial send"))
+		except OSError as err:
+			failed.append((i, f"send: {err}"))
+	return failed
 
 
 @dataclass
 class DataNewGame:
+	__slots__ = ("max_x", "max_y", "players_names")
+
 	max_x: int
 	max_y: int
 	players_names: List[str]
@@ -24,6 +79,8 @@ class DataNewGame:
 
 @dataclass
 class DataPixel:
+	__slots__ = ("player_num", "x", "y")
+
 	player_num: int
 	x: int
 	y: int
@@ -34,11 +91,15 @@ class DataPixel:
 
 @dataclass
 class DataPlayerEliminated:
+	__slots__ = ("player_num",)
+
 	player_num: int
 
 
 @dataclass
 class Event:
+	__slots__ = ("event_len", "event_no", "event_type", "event_data", "crc32")
+
 	event_len: int
 	event_no: int
 	event_type: int
@@ -49,6 +110,73 @@ class Event:
 		return f"ev {self.event_no} {self.event_data}"
 
 
+# Events as tests expect them, event_len and crc32 are -1 placeholders, the encoder computes both.
+def event_new_game(event_no, width, height, players) -> Event:
+	return Event(-1, event_no, 0, DataNewGame(width, height, players), -1)
+
+
+def event_pixel(event_no, player_no, x, y) -> Event:
+	return Event(-1, event_no, 1, DataPixel(player_no, x, y), -1)
+
+
+def event_player_eliminated(event_no, player_no) -> Event:
+	return Event(-1, event_no, 2, DataPlayerEliminated(player_no), -1)
+
+
+def event_game_over(event_no) -> Event:
+	return Event(-1, event_no, 3, None, -1)
+
+
+class LazyEvent:
+	"""
+	Event with header fields decoded right away and event_data decoded on first access.
+	It keeps a view of the received message, so a reused receive buffer must not be
+	overwritten before event_data is read.
+	"""
+	__slots__ = ("event_len", "event_no", "event_type", "crc32", "_b_data", "_event_data")
+
+	def __init__(self, event_len, event_no, event_type, b_data, crc32):
+		self.event_len = event_len
+		self.event_no = event_no
+		self.event_type = event_type
+		self.crc32 = crc32
+		self._b_data = b_data
+		self._event_data = None
+
+	@property
+	def event_data(self) -> Union[DataNewGame, DataPixel, DataPlayerEliminated]:
+		if self._b_data is not None:
+			self._event_data = deserialize_stc_event_data(self.event_type, self._b_data)
+			self._b_data = None
+		return self._event_data
+
+	def to_event(self) -> Event:
+		return Event(self.event_len, self.event_no, self.event_type, self.event_data, self.crc32)
+
+	def __str__(self):
+		return f"ev {self.event_no} {self.event_data}"
+
+
+class EventKey(NamedTuple):
+	"""
+	Hashable identity of an event, without event_len and crc32.
+	"""
+	event_no: int
+	event_type: int
+	data: Optional[tuple]
+
+
+def event_key(event) -> EventKey:
+	data = event.event_data
+	if event.event_type == 0:
+		data = (data.max_x, data.max_y, tuple(data.players_names))
+	elif event.event_type == 1:
+		data = (data.player_num, data.x, data.y)
+	elif event.event_type == 2:
+		data = (data.player_num,)
+	return EventKey(event.event_no, event.event_type, data)
+
+
 @dataclass
 class ServerMessage:
 	game_id: int
@@ -59,57 +187,493 @@ class ServerMessage:
 		return "\n".join(events_str)
 
 
+_GAME_ID = struct.Struct("!I")
+_EVENT_HEADER = struct.Struct("!IIB")
+_CRC32 = struct.Struct("!I")
+_NEW_GAME_SIZE = struct.Struct("!II")
+_PIXEL = struct.Struct("!BII")
+_PLAYER_ELIMINATED = struct.Struct("!B")
+
+# event_len counts event_no and event_type but not itself nor crc32.
+_EVENT_LEN_SIZE = 4
+_EVENT_HEADER_SIZE = _EVENT_HEADER.size
+_CRC32_SIZE = _CRC32.size
+
+# event_len of events with fixed size data, NEW_GAME has at least this many bytes.
+_EVENT_LENS = {
+	0: _EVENT_HEADER_SIZE - _EVENT_LEN_SIZE + _NEW_GAME_SIZE.size,
+	1: _EVENT_HEADER_SIZE - _EVENT_LEN_SIZE + _PIXEL.size,
+	2: _EVENT_HEADER_SIZE - _EVENT_LEN_SIZE + _PLAYER_ELIMINATED.size,
+	3: _EVENT_HEADER_SIZE - _EVENT_LEN_SIZE,
+}
+
+_PIXEL_EVENT = struct.Struct("!IIBBII")
+
+ERROR_LEN = "event_len"
+ERROR_CRC32 = "crc32"
+
+
+class InvalidMessageError(Exception):
+	def __init__(self, kind, description):
+		super().__init__(description)
+		self.kind = kind
+
+
+@dataclass
+class ValidationReport:
+	datagrams: int = 0
+	passed: int = 0
+	failed: int = 0
+	events: int = 0
+	len_errors: int = 0
+	crc32_errors: int = 0
+	# (datagram index, error description) of the first max_errors failed datagrams, failed counts all of them.
+	errors: List[Tuple[int, str]] = field(default_factory=list)
+	max_errors: int = 100
+
+	def __str__(self):
+		return f"datagrams {self.datagrams} passed {self.passed} failed {self.failed} events {self.events} " \
+			   f"event_len errors {self.len_errors} crc32 errors {self.crc32_errors}"
+
+
+def _new_game_names(event_data: DataNewGame) -> bytes:
+	return b"".join(str.encode(name) + b"\0" for name in event_data.players_names)
+
+
+def stc_event_size(event) -> int:
+	"""
+	Return number of bytes the event takes in a message, including event_len and crc32.
+	"""
+	event_len = _EVENT_LENS[event.event_type]
+	if event.event_type == 0:
+		event_len += len(_new_game_names(event.event_data))
+	return _EVENT_LEN_SIZE + event_len + _CRC32_SIZE
+
+
+def serialize_stc_event_into(buffer, offset, event, names=None) -> int:
+	"""
+	Write event into buffer, event_len and crc32 are computed, the ones in event are ignored.
+	:param buffer: bytearray big enough to hold the event
+	:param names: encoded NEW_GAME names if already known
+	:return: offset just after the event
+	"""
+	event_type = event.event_type
+	data = event.event_data
+	data_start = offset + _EVENT_HEADER_SIZE
+
+	if event_type == 1:
+		# Most frequent event, header and data in one pack.
+		data_end = data_start + _PIXEL.size
+		_PIXEL_EVENT.pack_into(buffer, offset, _EVENT_LENS[1], event.event_no, 1, data.player_num, data.x, data.y)
+		with memoryview(buffer) as view:
+			_CRC32.pack_into(buffer, data_end, zlib.crc32(view[offset:data_end]))
+		return data_end + _CRC32_SIZE
+	elif event_type == 2:
+		_PLAYER_ELIMINATED.pack_into(buffer, data_start, data.player_num)
+		data_end = data_start + _PLAYER_ELIMINATED.size
+	elif event_type == 0:
+		if names is None:
+			names = _new_game_names(data)
+		_NEW_GAME_SIZE.pack_into(buffer, data_start, data.max_x, data.max_y)
+		names_start = data_start + _NEW_GAME_SIZE.size
+		data_end = names_start + len(names)
+		buffer[names_start:data_end] = names
+	elif event_type == 3:
+		data_end = data_start
+	else:
+		raise Exception(f"invalid event_type={event_type}")
+
+	_EVENT_HEADER.pack_into(buffer, offset, data_end - offset - _EVENT_LEN_SIZE, event.event_no, event_type)
+	with memoryview(buffer) as view:
+		_CRC32.pack_into(buffer, data_end, zlib.crc32(view[offset:data_end]))
+	return data_end + _CRC32_SIZE
+
+
+def pack_stc_events_into(buffer, game_id, events, start=0, max_len=MAX_STC_MESSAGE_LEN) -> Tuple[int, int]:
+	"""
+	Greedily pack events, starting from events[start], into one server to client message.
+	:param buffer: bytearray of at least max_len bytes
+	:return: (message length, index of the first event that did not fit)
+	"""
+	_GAME_ID.pack_into(buffer, 0, game_id)
+	offset = _GAME_ID.size
+
+	i = start
+	while i < len(events):
+		event = events[i]
+		if event.event_type == 0:
+			names = _new_game_names(event.event_data)
+			size = _EVENT_LENS[0] + len(names) + _EVENT_LEN_SIZE + _CRC32_SIZE
+		else:
+			names = None
+			size = _EVENT_LENS.get(event.event_type, 0) + _EVENT_LEN_SIZE + _CRC32_SIZE
+		if offset + size > max_len:
+			if offset == _GAME_ID.size:
+				raise Exception(f"event {event.event_no} does not fit in {max_len} bytes")
+			break
+		offset = serialize_stc_event_into(buffer, offset, event, names)
+		i += 1
+
+	return offset, i
+
+
+def pack_stc_events(game_id, events, max_len=MAX_STC_MESSAGE_LEN) -> List[bytes]:
+	"""
+	Split events into as few server to client messages of at most max_len bytes as possible.
+	"""
+	buffer = bytearray(max_len)
+	messages = []
+	i = 0
+	while i < len(events):
+		length, i = pack_stc_events_into(buffer, game_id, events, i, max_len)
+		messages.append(bytes(buffer[:length]))
+	return messages
+
+
+def serialize_stc_message(server_message: ServerMessage) -> bytes:
+	"""
+	Return server to client message as bytes array, regardless of its size.
+	"""
+	buffer = bytearray(_GAME_ID.size + sum(map(stc_event_size, server_message.events)))
+	_GAME_ID.pack_into(buffer, 0, server_message.game_id)
+	offset = _GAME_ID.size
+	for event in server_message.events:
+		offset = serialize_stc_event_into(buffer, offset, event)
+	return bytes(buffer)
+
+
 def deserialize_stc_message_new_game(b_data) -> DataNewGame:
-	max_x, max_y = struct.unpack("!II", b_data[:8])
-	b_data = b_data[8:]
-	names = []
-	b_names = bytes.split(b_data, b"\0")
-	for b_name in b_names:
-		names.append(bytes.decode(b_name, "utf-8"))
+	max_x, max_y = _NEW_GAME_SIZE.unpack_from(b_data)
+	names = str(b_data[_NEW_GAME_SIZE.size:], "utf-8").split("\0")
 
 	return DataNewGame(max_x, max_y, names[:-1])
 
 
 def deserialize_stc_message_pixel(b_data) -> DataPixel:
-	player_num, x, y = struct.unpack("!BII", b_data)
+	player_num, x, y = _PIXEL.unpack(b_data)
 	return DataPixel(player_num, x, y)
 
 
 def deserialize_stc_message_player_eliminated(b_data) -> DataPlayerEliminated:
-	player_num, = struct.unpack("!B", b_data)
+	player_num, = _PLAYER_ELIMINATED.unpack(b_data)
 	return DataPlayerEliminated(player_num)
 
 
-def deserialize_stc_message(b_message) -> ServerMessage:
-	game_id, = struct.unpack("!I", b_message[:4])
-	server_message = ServerMessage(game_id)
+def deserialize_stc_event_data(event_type, b_data):
+	if event_type == 0:
+		return deserialize_stc_message_new_game(b_data)
+	elif event_type == 1:
+		return deserialize_stc_message_pixel(b_data)
+	elif event_type == 2:
+		return deserialize_stc_message_player_eliminated(b_data)
+	elif event_type == 3:
+		return None
+	else:
+		raise Exception(f"invalid event_type={event_type}")
 
-	b_message = b_message[4:]
 
-	while len(b_message):
-		b_header = b_message[:9]
-		event_len, event_no, event_type = struct.unpack("!IIB", b_header)
-		b_data = b_message[9:event_len + 4]
-		b_crc32 = b_message[event_len + 4:event_len + 8]
+def check_stc_event(view, offset, event_len, event_type) -> Optional[InvalidMessageError]:
+	"""
+	Check event_len and crc32 of the event starting at offset, without copying the buffer.
+	:param view: memoryview of the whole message
+	:return: None for a valid event, error otherwise
+	"""
+	data_end = offset + _EVENT_LEN_SIZE + event_len
+	if data_end + _CRC32_SIZE > len(view):
+		return InvalidMessageError(ERROR_LEN, f"event_len={event_len} exceeds message at offset {offset}")
+
+	min_len = _EVENT_LENS.get(event_type)
+	if min_len is None:
+		return InvalidMessageError(ERROR_LEN, f"invalid event_type={event_type}")
+	if event_type == 0:
+		if event_len < min_len or (event_len > min_len and view[data_end - 1] != 0):
+			return InvalidMessageError(ERROR_LEN, f"event_len={event_len} does not match NEW_GAME names")
+	elif event_len != min_len:
+		return InvalidMessageError(ERROR_LEN, f"event_len={event_len} for event_type={event_type}, expected {min_len}")
+
+	crc32, = _CRC32.unpack_from(view, data_end)
+	computed = zlib.crc32(view[offset:data_end])
+	if crc32 != computed:
+		return InvalidMessageError(ERROR_CRC32, f"crc32={crc32} of event at offset {offset}, computed {computed}")
 
-		crc32, = struct.unpack("!I", b_crc32)
-		# TODO check crc32 match
+	return None
 
-		event_data = None
+
+def check_stc_message(b_message) -> Tuple[int, Optional[InvalidMessageError]]:
+	"""
+	Check event_len and crc32 of all events of server to client message without decoding event data.
+	:return: (number of valid events, first error or None)
+	"""
+	view = memoryview(b_message)
+	end = len(view)
+	if end < _GAME_ID.size:
+		return 0, InvalidMessageError(ERROR_LEN, f"message too short, {end} bytes")
+
+	events = 0
+	offset = _GAME_ID.size
+	while offset < end:
+		if offset + _EVENT_HEADER_SIZE > end:
+			return events, InvalidMessageError(ERROR_LEN, f"truncated event header at offset {offset}")
+		event_len, event_no, event_type = _EVENT_HEADER.unpack_from(view, offset)
+		err = check_stc_event(view, offset, event_len, event_type)
+		if err is not None:
+			return events, err
+		events += 1
+		offset += _EVENT_LEN_SIZE + event_len + _CRC32_SIZE
+
+	return events, None
+
+
+def validate_stc_messages(b_messages, report=None) -> ValidationReport:
+	"""
+	Check a batch of server to client messages, e.g. a whole capture.
+	:param b_messages: iterable of bytes-like messages
+	:param report: report to accumulate into, useful for long runs checked in chunks;
+		ValidationReport(max_errors=0) records no error descriptions
+	:return: report with per-datagram pass/fail counts
+	"""
+	if report is None:
+		report = ValidationReport()
+
+	for b_message in b_messages:
+		events, err = check_stc_message(b_message)
+		report.events += events
+		if err is None:
+			report.passed += 1
+		else:
+			report.failed += 1
+			if err.kind == ERROR_CRC32:
+				report.crc32_errors += 1
+			else:
+				report.len_errors += 1
+			if len(report.errors) < report.max_errors:
+				report.errors.append((report.datagrams, str(err)))
+		report.datagrams += 1
+
+	return report
+
+
+def deserialize_stc_game_id(b_message) -> int:
+	game_id, = _GAME_ID.unpack_from(b_message)
+	return game_id
+
+
+def iter_stc_events(b_message, strict=False, lazy=False) -> Iterator[Union[Event, LazyEvent]]:
+	"""
+	Lazily parse events of server to client message, one event per iteration.
+	Use deserialize_stc_game_id to read the message game_id.
+	:param b_message: any bytes-like object, it is walked through a memoryview and never copied
+	:param strict: raise InvalidMessageError on event_len or crc32 mismatch
+	:param lazy: yield LazyEvent objects that decode event_data only when it is accessed
+	:return: generator of events
+	"""
+	view = memoryview(b_message)
+	offset = _GAME_ID.size
+	end = len(view)
+
+	while offset < end:
+		if strict and offset + _EVENT_HEADER_SIZE > end:
+			raise InvalidMessageError(ERROR_LEN, f"truncated event header at offset {offset}")
+		event_len, event_no, event_type = _EVENT_HEADER.unpack_from(view, offset)
+		if strict:
+			err = check_stc_event(view, offset, event_len, event_type)
+			if err is not None:
+				raise err
+
+		data_end = offset + _EVENT_LEN_SIZE + event_len
+		b_data = view[offset + _EVENT_HEADER_SIZE:data_end]
+		crc32, = _CRC32.unpack_from(view, data_end)
+
+		if lazy:
+			if event_type not in _EVENT_LENS:
+				raise Exception(f"invalid event_type={event_type}")
+			yield LazyEvent(event_len, event_no, event_type, b_data, crc32)
+		else:
+			event_data = deserialize_stc_event_data(event_type, b_data)
+			yield Event(event_len, event_no, event_type, event_data, crc32)
+
+		offset = data_end + _CRC32_SIZE
+
+
+def deserialize_stc_message(b_message, strict=False, lazy=False) -> ServerMessage:
+	"""
+	Parse server to client message.
+	:param b_message: any bytes-like object, it is walked through a memoryview and never copied
+	:param strict: raise InvalidMessageError on event_len or crc32 mismatch
+	:param lazy: create LazyEvent objects that decode event_data only when it is accessed
+	:return: parsed message
+	"""
+	return ServerMessage(deserialize_stc_game_id(b_message), list(iter_stc_events(b_message, strict, lazy)))
+
+
+def recv_stc_events(sock, buffer=None, flags=0, strict=False) -> Iterator[Tuple[int, Event]]:
+	"""
+	Receive server to client messages into one reusable buffer and yield their events.
+	With a blocking socket the generator never ends, with a non-blocking socket
+	(or flags=socket.MSG_DONTWAIT) it ends once there is nothing more to read.
+	:param sock: connected UDP socket
+	:param buffer: writable buffer for received datagrams, allocated if not given
+	:param flags: flags passed to sock.recv_into
+	:param strict: raise InvalidMessageError on event_len or crc32 mismatch
+	:return: generator of (game_id, event) pairs
+	"""
+	if buffer is None:
+		buffer = bytearray(RECV_BUFFER_SIZE)
+	view = memoryview(buffer)
+
+	while True:
+		try:
+			n = sock.recv_into(view, 0, flags)
+		except BlockingIOError:
+			return
+		b_message = view[:n]
+		game_id = deserialize_stc_game_id(b_message)
+		for ev in iter_stc_events(b_message, strict):
+			yield game_id, ev
+
+
+class EventBatch:
+	"""
+	Events stored column-wise in arrays, 18 bytes per event instead of two dataclass objects.
+	event_len is not stored, it is computed back when converting to Event.
+	player_num, x and y are 0 for events without them, NEW_GAME data is kept aside by row.
+	crc32 is stored modulo 2 ** 32, so the -1 placeholder of expected events reads back as 0xFFFFFFFF.
+	"""
+	__slots__ = ("event_no", "event_type", "player_num", "x", "y", "crc32", "new_games")
+
+	def __init__(self, events=()):
+		self.event_no = array("I")
+		self.event_type = array("B")
+		self.player_num = array("B")
+		self.x = array("I")
+		self.y = array("I")
+		self.crc32 = array("I")
+		self.new_games = {}
+
+		self.extend(events)
+
+	def __len__(self):
+		return len(self.event_no)
+
+	def _append_row(self, event_no, event_type, player_num, x, y, crc32):
+		row = len(self.event_no)
+		try:
+			self.event_no.append(event_no)
+			self.event_type.append(event_type)
+			self.player_num.append(player_num)
+			self.x.append(x)
+			self.y.append(y)
+			self.crc32.append(crc32)
+		except (OverflowError, TypeError):
+			# Keep all columns the same length when a value does not fit its column.
+			for column in (self.event_no, self.event_type, self.player_num, self.x, self.y, self.crc32):
+				del column[row:]
+			raise
+
+	def append(self, event: Event):
+		data = event.event_data
+		crc32 = event.crc32 & 0xFFFFFFFF
+		if event.event_type == 0:
+			self._append_row(event.event_no, 0, 0, 0, 0, crc32)
+			self.new_games[len(self) - 1] = data
+		elif event.event_type == 1:
+			self._append_row(event.event_no, 1, data.player_num, data.x, data.y, crc32)
+		elif event.event_type == 2:
+			self._append_row(event.event_no, 2, data.player_num, 0, 0, crc32)
+		else:
+			self._append_row(event.event_no, event.event_type, 0, 0, 0, crc32)
+
+	def extend(self, events):
+		for ev in events:
+			self.append(ev)
+
+	def extend_from_message(self, b_message, strict=False) -> int:
+		"""
+		Parse server to client message straight into the columns, without creating Event objects.
+		:return: message game_id
+		"""
+		view = memoryview(b_message)
+		offset = _GAME_ID.size
+		end = len(view)
+
+		while offset < end:
+			if strict and offset + _EVENT_HEADER_SIZE > end:
+				raise InvalidMessageError(ERROR_LEN, f"truncated event header at offset {offset}")
+			event_len, event_no, event_type = _EVENT_HEADER.unpack_from(view, offset)
+			if strict:
+				err = check_stc_event(view, offset, event_len, event_type)
+				if err is not None:
+					raise err
+
+			data_start = offset + _EVENT_HEADER_SIZE
+			data_end = offset + _EVENT_LEN_SIZE + event_len
+			crc32, = _CRC32.unpack_from(view, data_end)
+
+			if event_type == 1:
+				player_num, x, y = _PIXEL.unpack(view[data_start:data_end])
+				self._append_row(event_no, 1, player_num, x, y, crc32)
+			elif event_type == 2:
+				player_num, = _PLAYER_ELIMINATED.unpack(view[data_start:data_end])
+				self._append_row(event_no, 2, player_num, 0, 0, crc32)
+			elif event_type == 0:
+				new_game = deserialize_stc_message_new_game(view[data_start:data_end])
+				self._append_row(event_no, 0, 0, 0, 0, crc32)
+				self.new_games[len(self) - 1] = new_game
+			elif event_type == 3:
+				self._append_row(event_no, 3, 0, 0, 0, crc32)
+			else:
+				raise Exception(f"invalid event_type={event_type}")
+
+			offset = data_end + _CRC32_SIZE
+
+		return deserialize_stc_game_id(view)
+
+	def event(self, i) -> Event:
+		event_type = self.event_type[i]
+		event_len = _EVENT_LENS[event_type]
 		if event_type == 0:
-			event_data = deserialize_stc_message_new_game(b_data)
+			event_data = self.new_games[i]
+			event_len += sum(len(str.encode(name)) + 1 for name in event_data.players_names)
 		elif event_type == 1:
-			event_data = deserialize_stc_message_pixel(b_data)
+			event_data = DataPixel(self.player_num[i], self.x[i], self.y[i])
 		elif event_type == 2:
-			event_data = deserialize_stc_message_player_eliminated(b_data)
-		elif event_type == 3:
-			event_data = None
+			event_data = DataPlayerEliminated(self.player_num[i])
 		else:
-			raise Exception(f"invalid event_type={event_type}")
-
-		ev = Event(event_len, event_no, event_type, event_data, crc32)
-		server_message.events.append(ev)
-
-		b_message = b_message[event_len + 8:]
+			event_data = None
 
-	return server_message
+		return Event(event_len, self.event_no[i], event_type, event_data, self.crc32[i])
+
+	def __getitem__(self, i) -> Event:
+		if i < 0:
+			i += len(self)
+		if not 0 <= i < len(self):
+			raise IndexError("EventBatch index out of range")
+		return self.event(i)
+
+	def __iter__(self) -> Iterator[Event]:
+		for i in range(len(self)):
+			yield self.event(i)
+
+	def events(self) -> List[Event]:
+		return list(self)
+
+	def nbytes(self):
+		columns = (self.event_no, self.event_type, self.player_num, self.x, self.y, self.crc32)
+		return sum(c.itemsize * len(c) for c in columns)
+
+	def to_numpy(self):
+		"""
+		Zero-copy NumPy views of the columns, for vectorized queries over whole games.
+		Requires numpy. While any of the views is alive, appending to the batch raises BufferError.
+		:return: dict column name -> numpy array
+		"""
+		import numpy
+
+		return {
+			"event_no": numpy.frombuffer(self.event_no, dtype=numpy.uint32),
+			"event_type": numpy.frombuffer(self.event_type, dtype=numpy.uint8),
+			"player_num": numpy.frombuffer(self.player_num, dtype=numpy.uint8),
+			"x": numpy.frombuffer(self.x, dtype=numpy.uint32),
+			"y": numpy.frombuffer(self.y, dtype=numpy.uint32),
+			"crc32": numpy.frombuffer(self.crc32, dtype=numpy.uint32),
+		}
@@ -3,8 +3,10 @@ import argparse
 import select
 import string
 import time
-from linuxfd import timerfd
 import communication
+import capture
+from event_store import EventStore
+from histogram import Histogram
 import random
 
 
@@ -12,78 +14,351 @@ def random_name(n=20):
 	return ''.join(random.choices(string.ascii_uppercase + string.digits, k=n))
 
 
-def init_parser():
-	default_session_id = int(time.time() * 1000)
-	default_name = random_name(5)
+def strategy_zigzag(bot):
+	return 1 if (bot.sent // 10) % 2 == 0 else 2
 
-	parser = argparse.ArgumentParser()
-	parser.add_argument("-a", "--addr", default="localhost")
-	parser.add_argument("-p", "--port", default="2021")
-	parser.add_argument("-s", "--session", default=default_session_id, type=int)
-	parser.add_argument("-n", "--name", default=default_name)
 
-	return parser
+# turn_direction chosen before every message: 0 - straight, 1 - right, 2 - left.
+STRATEGIES = {
+	"right": lambda bot: 1,
+	"left": lambda bot: 2,
+	"straight": lambda bot: 0,
+	"random": lambda bot: random.randint(0, 2),
+	"zigzag": strategy_zigzag,
+}
 
 
-if __name__ == '__main__':
-	args = init_parser().parse_args()
+class Bot:
+	def __init__(self, sock, session_id, name, strategy="right", interval_s=0.03, verbose=False, rounds_per_sec=None):
+		self.sock = sock
+		self.session_id = session_id
+		self.name = name
+		self.strategy = STRATEGIES[strategy]
+		self.interval_s = interval_s
+		self.verbose = verbose
+
+		self.encoder = communication.CtsEncoder(session_id, name)
+		self.recv_view = memoryview(bytearray(communication.RECV_BUFFER_SIZE))
+		self.next_send_time = 0.0
+
+		# capture.CaptureWriter of received datagrams, if set.
+		self.capture = None
+
+		# Headers of lazy events only, their data views the reused receive buffer.
+		self.store = EventStore()
+
+		self.sent = 0
+		self.send_failures = 0
+		self.received = 0
+		# Failed receives, e.g. ECONNREFUSED when the server is gone, and datagrams that could not be parsed.
+		self.recv_errors = 0
+		self.invalid_datagrams = 0
+		self.events_received = 0
+		# Events received ahead of next_event_no over all games, EventStore counts only the current game.
+		self.events_ahead = 0
+
+		# Time from sending next_expected_event_no to receiving that event.
+		self.latency = Histogram()
+		self.requested_event_no = None
+		self.requested_time = 0.0
+
+		# Time between datagrams bringing new PIXEL events, i.e. between game rounds, and its deviation
+		# from the round time of the server. Datagrams within a quarter of the round time belong to one round.
+		self.round_time = 1.0 / rounds_per_sec if rounds_per_sec else None
+		self.round_interval = Histogram()
+		self.tick_jitter = Histogram()
+		self.last_round_time = None
+
+	@property
+	def next_event_no(self):
+		return self.store.next_event_no
+
+	def lag(self):
+		"""
+		Number of events the bot knows about but has not received in order yet.
+		"""
+		return self.store.lag()
+
+	def next_message(self, now, slack=0.0):
+		"""
+		:param slack: how early a message may be sent, half the period of the timer driving the bot,
+		so that a tick handled a bit earlier than the previous one is not skipped
+		:return: arguments of communication.send_cts_messages for the message due at now, None if the bot
+		interval has not passed; on_sent must be called with the result
+		"""
+		if now < self.next_send_time - slack:
+			return None
+		# Deadlines advance by the interval, so jitter of the ticks does not add up.
+		self.next_send_time += self.interval_s
+		if self.next_send_time <= now:
+			# First message or more than an interval behind.
+			self.next_send_time = now + self.interval_s
+
+		if self.requested_event_no != self.next_event_no:
+			self.requested_event_no = self.next_event_no
+			self.requested_time = now
+
+		return self.sock, self.encoder, self.strategy(self), self.next_event_no
+
+	def on_sent(self, error=None):
+		"""
+		:param error: description of the failure, None if the message was sent
+		"""
+		if error is not None:
+			self.send_failures += 1
+			if self.verbose:
+				print(error)
+			return
+		self.sent += 1
+		if self.verbose:
+			print(f"neen={self.next_event_no} sent {len(self.encoder.view)} bytes to server")
+
+	def on_tick(self, now):
+		"""
+		Send the next message if the bot interval has passed.
+		"""
+		message = self.next_message(now)
+		if message is not None:
+			failed = communication.send_cts_messages([message])
+			self.on_sent(failed[0][1] if failed else None)
+
+	def on_round(self, now):
+		if self.last_round_time is not None:
+			interval = now - self.last_round_time
+			if interval < self.round_time / 4:
+				return
+			self.round_interval.record(interval)
+			self.tick_jitter.record(abs(interval - self.round_time))
+		self.last_round_time = now
+
+	def on_readable(self):
+		try:
+			b_message = self.recv_view[:self.sock.recv_into(self.recv_view)]
+		except OSError as err:
+			self.recv_errors += 1
+			if self.verbose:
+				print(f"recv: {err}")
+			return
+		if self.capture is not None:
+			self.capture.write(b_message)
+		self.on_datagram(b_message)
+
+	def on_datagram(self, b_message):
+		self.received += 1
+		if self.verbose:
+			print(f"neen={self.next_event_no} received {len(b_message)} bytes from server")
+		try:
+			mess_game_id = communication.deserialize_stc_game_id(b_message)
+			if self.store.game_id != mess_game_id:
+				self.store.reset(mess_game_id)
+				self.last_round_time = None
+				if self.requested_event_no != 0:
+					self.requested_event_no = None
+			for e in communication.iter_stc_events(b_message, lazy=True):
+				self.events_received += 1
+				out_of_order = self.store.out_of_order
+				ready = self.store.add(e)
+				self.events_ahead += self.store.out_of_order - out_of_order
+				if not ready:
+					continue
+				now = time.monotonic()
+				requested = self.requested_event_no
+				if requested is not None and ready[0].event_no <= requested <= ready[-1].event_no:
+					self.latency.record(now - self.requested_time)
+					self.requested_event_no = None
+				if self.round_time is not None and any(e.event_type == 1 for e in ready):
+					self.on_round(now)
+				if ready[-1].event_type == 3:
+					if self.verbose:
+						print("GAME OVER")
+					self.store.reset(mess_game_id)
+					self.last_round_time = None
+					break
+		except Exception as err:
+			# A malformed datagram must not stop the other sessions, events before the error are kept.
+			self.invalid_datagrams += 1
+			if self.verbose:
+				print(f"invalid datagram of {len(b_message)} bytes: {err}")
+				print(bytes(b_message))
+
+
+class SwarmStats:
+	def __init__(self, bots):
+		self.bots = bots
+		self.start = time.monotonic()
+
+	def __str__(self):
+		elapsed = time.monotonic() - self.start
+		sent = sum(b.sent for b in self.bots)
+		failures = sum(b.send_failures for b in self.bots)
+		recv_errors = sum(b.recv_errors for b in self.bots)
+		invalid = sum(b.invalid_datagrams for b in self.bots)
+		events = sum(b.events_received for b in self.bots)
+		lags = [b.lag() for b in self.bots]
+		# Histograms are not merged here, that would cost more than the bots for large swarms, see sessions().
+		return f"{elapsed:.1f}s bots {len(self.bots)} sent {sent} ({sent / elapsed:.0f}/s) failed {failures} " \
+			   f"recv errors {recv_errors} invalid {invalid} events {events} ({events / elapsed:.0f}/s) lag avg {sum(lags) / len(lags):.1f} max {max(lags)}"
+
+	def histograms(self):
+		"""
+		:return: latency, round interval and tick jitter histograms merged over all bots
+		"""
+		merged = (Histogram(), Histogram(), Histogram())
+		# Bots may share histograms, e.g. in load_generator workers, each is merged once.
+		for i, name in enumerate(("latency", "round_interval", "tick_jitter")):
+			for histogram in {id(h): h for h in (getattr(bot, name) for bot in self.bots)}.values():
+				merged[i].merge(histogram)
+		return merged
 
-	info_list = socket.getaddrinfo(args.addr, args.port, family=socket.AF_INET, type=socket.SOCK_DGRAM)
+	def sessions(self):
+		"""
+		:return: per-session histogram summary, one line per bot followed by all bots merged
+		"""
+		lines = []
+		for bot in self.bots:
+			lines.append(f"session {bot.session_id} {bot.name or '(observer)'}:")
+			lines.append(f"  latency {bot.latency}")
+			if bot.round_time is not None:
+				lines.append(f"  round interval {bot.round_interval}")
+				lines.append(f"  tick jitter {bot.tick_jitter}")
+		if len(self.bots) > 1:
+			latency, round_interval, tick_jitter = self.histograms()
+			lines.append("all sessions:")
+			lines.append(f"  latency {latency}")
+			if self.bots[0].round_time is not None:
+				lines.append(f"  round interval {round_interval}")
+				lines.append(f"  tick jitter {tick_jitter}")
+		return "\n".join(lines)
+
+
+def connect(addr, port):
+	info_list = socket.getaddrinfo(addr, port, family=socket.AF_INET, type=socket.SOCK_DGRAM)
 
 	sock = None
-	addr = None
+	sock_addr = None
 	for info in info_list:
 		try:
 			sock = socket.socket(info[0], info[1], info[2])
-			addr = info[4]
-			sock.connect(addr)
+			sock_addr = info[4]
+			sock.connect(sock_addr)
 			break
 		except OSError as err:
 			print(f"connect: {err}")
 
-	print(f"testing server {addr[0]}:{addr[1]}")
+	return sock, sock_addr
 
-	epoll = select.epoll()
-	epoll.register(sock.fileno(), eventmask=select.EPOLLIN)
 
-	timer = timerfd()
+def run_bots(bots, report=None, report_interval_s=1.0, duration_s=None):
+	"""
+	Drive all bots from one epoll loop and one shared timer ticking at the shortest bot interval,
+	messages of the bots due on a tick are sent with one communication.send_cts_messages call.
+	:param report: called with no arguments every report_interval_s seconds
+	:param duration_s: stop after this many seconds, run forever if None
+	"""
+	# Imported here so that the Bot class can be used without linuxfd, e.g. by async_client.py.
+	from linuxfd import timerfd
 
-	interval_ms = 30  # default 30
-	interval_s = float(interval_ms) / 1000.0
+	epoll = select.epoll()
+	bots_by_fd = {}
+	for bot in bots:
+		epoll.register(bot.sock.fileno(), eventmask=select.EPOLLIN)
+		bots_by_fd[bot.sock.fileno()] = bot
 
-	timer.settime(interval_s, interval_s)
+	timer = timerfd()
+	tick_s = min(b.interval_s for b in bots)
+	timer.settime(tick_s, tick_s)
 	epoll.register(timer.fileno(), eventmask=select.EPOLLIN)
 
-	next_event_no = 0
-	game_id = 0
-	while True:
-		epoll_events = epoll.poll(timeout=-1, maxevents=10)
+	start = time.monotonic()
+	next_report = start + report_interval_s
+	while duration_s is None or time.monotonic() - start < duration_s:
+		epoll_events = epoll.poll(timeout=tick_s, maxevents=len(bots) + 1)
 
 		for (fd, event_mask) in epoll_events:
 			if fd == timer.fileno():
 				timer.read()
-				m_client = communication.serialize_cts_message(args.session, 1, next_event_no, args.name)
-				if sock.send(m_client) != len(m_client):
-					print("partial send")
-				print(f"neen={next_event_no} sent {len(m_client)} bytes to server")
-
-			elif fd == sock.fileno():
-				b_message = sock.recv(1024)
-				print(f"neen={next_event_no} received {len(b_message)} bytes from server")
-				try:
-					mess = communication.deserialize_stc_message(b_message)
-				except Exception as err:
-					print(len(b_message))
-					print(b_message)
-					print(err)
-					exit(1)
-
-				if game_id != mess.game_id:
-					game_id = mess.game_id
-					next_event_no = 0
-				for e in mess.events:
-					if e.event_no == next_event_no:
-						next_event_no += 1
-					if e.event_type == 3:
-						print("GAME OVER")
-						next_event_no = 0
+				now = time.monotonic()
+				due = []
+				sends = []
+				for bot in bots:
+					message = bot.next_message(now, tick_s / 2)
+					if message is not None:
+						due.append(bot)
+						sends.append(message)
+				errors = dict(communication.send_cts_messages(sends))
+				for i, bot in enumerate(due):
+					bot.on_sent(errors.get(i))
+
+				if report is not None and now >= next_report:
+					next_report += report_interval_s
+					report()
+
+			elif fd in bots_by_fd:
+				bots_by_fd[fd].on_readable()
+
+	epoll.close()
+	timer.close()
+
+
+def init_parser():
+	default_session_id = int(time.time() * 1000)
+	default_name = random_name(5)
+
+	parser = argparse.ArgumentParser()
+	parser.add_argument("-a", "--addr", default="localhost")
+	parser.add_argument("-p", "--port", default="2021")
+	parser.add_argument("-s", "--session", default=default_session_id, type=int)
+	parser.add_argument("-n", "--name", default=default_name)
+	parser.add_argument("-b", "--bots", default=1, type=int, help="number of players in swarm mode")
+	parser.add_argument("-o", "--observers", default=0, type=int, help="number of observers (empty name)")
+	parser.add_argument("--strategy", default="right",
+						help=f"comma separated turn strategies cycled over bots, one of {', '.join(STRATEGIES)}")
+	parser.add_argument("-i", "--interval", default="30", help="comma separated send intervals [ms] cycled over bots")
+	parser.add_argument("-v", "--rounds-per-sec", default=None, type=int,
+						help="server rounds per second, enables round interval and tick jitter histograms")
+	parser.add_argument("--capture", default=None,
+						help="capture received datagrams to this file, with .<bot number> appended in swarm mode")
+
+	return parser
+
+
+def create_bots(args, verbose):
+	strategies = args.strategy.split(",")
+	intervals = [float(i) / 1000.0 for i in args.interval.split(",")]
+
+	bots = []
+	for i in range(args.bots + args.observers):
+		sock, addr = connect(args.addr, args.port)
+		if i >= args.bots:
+			name = ""
+		elif args.bots == 1:
+			name = args.name
+		else:
+			name = f"{args.name}{i}"
+		bot = Bot(sock, args.session + i, name, strategies[i % len(strategies)], intervals[i % len(intervals)], verbose,
+				  args.rounds_per_sec)
+		if args.capture is not None:
+			path = args.capture if args.bots + args.observers == 1 else f"{args.capture}.{i}"
+			bot.capture = capture.CaptureWriter(path)
+		bots.append(bot)
+	return bots, addr
+
+
+if __name__ == '__main__':
+	args = init_parser().parse_args()
+
+	swarm = args.bots + args.observers > 1
+	bots, addr = create_bots(args, not swarm)
+
+	print(f"testing server {addr[0]}:{addr[1]}")
+
+	stats = SwarmStats(bots)
+	try:
+		run_bots(bots, (lambda: print(stats)) if swarm else None)
+	except KeyboardInterrupt:
+		print(stats)
+		print(stats.sessions())
+	finally:
+		for bot in bots:
+			if bot.capture is not None:
+				bot.capture.close()
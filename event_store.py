@@ -0,0 +1,113 @@
+from typing import List, Optional, Tuple
+
+
+class EventStore:
+	"""
+	Events of one game, delivered in event_no order.
+	Events received ahead of next_event_no wait in a ring buffer of reorder_window slots,
+	events older than next_event_no or already waiting are duplicates.
+	Counters (delivered, duplicates, dropped, out_of_order) cover the current game since reset().
+	"""
+	__slots__ = ("reorder_window", "slots", "game_id", "next_event_no", "max_event_no", "pending",
+				 "log", "delivered", "duplicates", "dropped", "out_of_order")
+
+	def __init__(self, reorder_window=1024, keep_log=False):
+		"""
+		:param reorder_window: how far ahead of next_event_no events are kept
+		:param keep_log: keep delivered events, log[event_no] is then the event
+		"""
+		self.reorder_window = reorder_window
+		self.slots = [None] * reorder_window
+		self.log = [] if keep_log else None
+		self.reset()
+
+	def reset(self, game_id=None):
+		for i in range(self.reorder_window):
+			self.slots[i] = None
+		if self.log is not None:
+			self.log.clear()
+		self.game_id = game_id
+		self.next_event_no = 0
+		self.max_event_no = -1
+		self.pending = 0
+
+		self.delivered = 0
+		self.duplicates = 0
+		self.dropped = 0
+		self.out_of_order = 0
+
+	def add(self, event) -> List:
+		"""
+		Store event received in any order.
+		:return: events that can now be delivered in order, possibly none
+		"""
+		event_no = event.event_no
+		offset = event_no - self.next_event_no
+		if offset < 0:
+			self.duplicates += 1
+			return []
+		if offset >= self.reorder_window:
+			self.dropped += 1
+			return []
+
+		self.max_event_no = max(self.max_event_no, event_no)
+		if offset > 0:
+			slot = event_no % self.reorder_window
+			if self.slots[slot] is not None:
+				self.duplicates += 1
+			else:
+				self.slots[slot] = event
+				self.pending += 1
+				self.out_of_order += 1
+			return []
+
+		ready = [event]
+		self.next_event_no += 1
+		while self.pending:
+			slot = self.next_event_no % self.reorder_window
+			waiting = self.slots[slot]
+			if waiting is None:
+				break
+			self.slots[slot] = None
+			self.pending -= 1
+			ready.append(waiting)
+			self.next_event_no += 1
+
+		self.delivered += len(ready)
+		if self.log is not None:
+			self.log.extend(ready)
+		return ready
+
+	def get(self, event_no) -> Optional[object]:
+		"""
+		Return stored event or None, delivered events are available only with keep_log.
+		"""
+		if event_no < self.next_event_no:
+			return self.log[event_no] if self.log is not None else None
+		if event_no - self.next_event_no >= self.reorder_window:
+			return None
+		return self.slots[event_no % self.reorder_window]
+
+	def lag(self) -> int:
+		"""
+		Number of events known to exist but not delivered yet.
+		"""
+		return self.max_event_no + 1 - self.next_event_no
+
+	def gaps(self) -> List[Tuple[int, int]]:
+		"""
+		Missing events between next_event_no and the highest received event.
+		:return: list of [first, last] ranges
+		"""
+		gaps = []
+		first = None
+		for event_no in range(self.next_event_no, self.max_event_no + 1):
+			missing = self.slots[event_no % self.reorder_window] is None
+			if missing and first is None:
+				first = event_no
+			elif not missing and first is not None:
+				gaps.append((first, event_no - 1))
+				first = None
+		if first is not None:
+			gaps.append((first, self.max_event_no))
+		return gaps
@@ -1,12 +1,173 @@
 import socket
 import argparse
 import select
+import time
+from typing import List, Optional, Tuple
 from linuxfd import timerfd
+import board
+import communication
+
+
+class LineBuffer:
+	"""
+	Reassembles newline-terminated lines from TCP reads split at arbitrary points.
+	"""
+
+	def __init__(self):
+		self.buffer = bytearray()
+
+	def feed(self, data) -> List[bytes]:
+		"""
+		:return: lines completed by data, without the newline
+		"""
+		self.buffer += data
+		end = self.buffer.rfind(b"\n")
+		if end < 0:
+			return []
+		lines = bytes(self.buffer[:end]).split(b"\n")
+		del self.buffer[:end + 1]
+		return lines
+
+
+class GuiState:
+	"""
+	Board state built from the lines sent by a game client, in the GUI protocol format:
+	NEW_GAME maxx maxy player_name..., PIXEL x y player_name, PLAYER_ELIMINATED player_name.
+	Inconsistencies are collected by board.Board with line numbers in place of event numbers.
+	"""
+
+	def __init__(self):
+		self.board: Optional[board.Board] = None
+		self.players = {}
+		self.lines = 0
+		self.games = 0
+		self.pixels = 0
+		self.errors: List[str] = []
+
+	def on_line(self, line: bytes):
+		self.lines += 1
+		words = line.decode(errors="replace").split()
+		try:
+			if words[0] == "NEW_GAME":
+				self.new_game(int(words[1]), int(words[2]), words[3:])
+			elif self.board is None:
+				self.errors.append(f"line {self.lines}: {words[0]} before NEW_GAME")
+			elif words[0] == "PIXEL" and len(words) == 4:
+				self.pixels += 1
+				self.board.apply_pixel(self.lines, self.player_num(words[3]), int(words[1]), int(words[2]))
+			elif words[0] == "PLAYER_ELIMINATED" and len(words) == 2:
+				self.board.apply_player_eliminated(self.lines, self.player_num(words[1]))
+			else:
+				self.errors.append(f"line {self.lines}: invalid line {line}")
+		except (IndexError, ValueError):
+			self.errors.append(f"line {self.lines}: invalid line {line}")
+
+	def new_game(self, max_x, max_y, players_names):
+		if self.board is not None:
+			self.errors.extend(self.board.errors)
+		self.board = board.Board(communication.DataNewGame(max_x, max_y, players_names))
+		self.players = {name: i for i, name in enumerate(players_names)}
+		self.games += 1
+
+	def player_num(self, name):
+		# Unknown names map past the last player, board.Board reports them.
+		return self.players.get(name, len(self.players))
+
+	def all_errors(self) -> List[str]:
+		return self.errors + (self.board.errors if self.board is not None else [])
+
+
+class GuiClient:
+	"""
+	Non-blocking GUI connection, data that the socket does not take right away waits in out_buffer
+	and is flushed on EPOLLOUT.
+	"""
+
+	def __init__(self, sock, addr, max_buffered=1 << 20):
+		self.sock = sock
+		self.addr = addr
+		self.line_buffer = LineBuffer()
+		self.state = GuiState()
+		self.bytes = 0
+		self.reported_lines = 0
+		self.reported_bytes = 0
+
+		self.out_buffer = bytearray()
+		self.max_buffered = max_buffered
+		self.keys_sent = 0
+		self.keys_dropped = 0
+		self.reported_keys = 0
+
+	def on_data(self, data, verbose=False):
+		self.bytes += len(data)
+		for line in self.line_buffer.feed(data):
+			if verbose:
+				print(f"client data: {line}")
+			self.state.on_line(line)
+
+	def send_key(self, key) -> bool:
+		"""
+		Queue key line, dropped if max_buffered bytes are already waiting.
+		:return: True if EPOLLOUT is needed to flush the buffer
+		"""
+		if len(self.out_buffer) + len(key) > self.max_buffered:
+			self.keys_dropped += 1
+			return True
+		self.out_buffer += key
+		self.keys_sent += 1
+		return self.flush()
+
+	def flush(self) -> bool:
+		"""
+		Send as much buffered data as the socket takes.
+		:return: True if data is still waiting
+		"""
+		try:
+			sent = self.sock.send(self.out_buffer)
+			del self.out_buffer[:sent]
+		except OSError:
+			pass  # Would block, or the connection is broken which epoll reports with EPOLLHUP or EPOLLERR.
+		return len(self.out_buffer) > 0
+
+	def report(self, elapsed_s):
+		"""
+		Print lines/s, bytes/s and keys/s since the previous report.
+		"""
+		lines_s = (self.state.lines - self.reported_lines) / elapsed_s
+		bytes_s = (self.bytes - self.reported_bytes) / elapsed_s
+		keys_s = (self.keys_sent - self.reported_keys) / elapsed_s
+		self.reported_lines = self.state.lines
+		self.reported_bytes = self.bytes
+		self.reported_keys = self.keys_sent
+		print(f"client {self.addr[0]}:{self.addr[1]} lines/s {lines_s:.0f} bytes/s {bytes_s:.0f} "
+			  f"games {self.state.games} pixels {self.state.pixels} errors {len(self.state.all_errors())} "
+			  f"keys/s {keys_s:.0f} keys dropped {self.keys_dropped} buffered {len(self.out_buffer)}")
+
+
+KEYS = ("LEFT_KEY_DOWN", "LEFT_KEY_UP", "RIGHT_KEY_DOWN", "RIGHT_KEY_UP")
+
+
+def parse_key_script(script) -> List[Tuple[bytes, float]]:
+	"""
+	:param script: comma separated KEY:ms steps, each sends KEY ms milliseconds after the previous one,
+		e.g. "LEFT_KEY_DOWN:20,LEFT_KEY_UP:20"; the script repeats
+	:return: list of (key line, delay in seconds)
+	"""
+	steps = []
+	for step in script.split(","):
+		key, _, delay_ms = step.partition(":")
+		if key not in KEYS:
+			raise ValueError(f"unknown key {key}, expected one of {', '.join(KEYS)}")
+		steps.append((str.encode(key) + b"\n", float(delay_ms or 0) / 1000.0))
+	return steps
 
 
 def init_parser():
 	parser = argparse.ArgumentParser()
 	parser.add_argument("-p", "--port", default="20210")
+	parser.add_argument("-q", "--quiet", action="store_true", help="do not print received lines, only stats")
+	parser.add_argument("-k", "--keys", default="LEFT_KEY_DOWN:1000",
+						help="key script sent to every client in a loop, comma separated KEY:ms steps")
 
 	return parser
 
@@ -38,37 +199,68 @@ if __name__ == '__main__':
 	epoll = select.epoll()
 	epoll.register(sock.fileno(), eventmask=select.EPOLLIN)
 
-	timer = timerfd()
-	timer.settime(1, 1)
-	epoll.register(timer.fileno(), eventmask=select.EPOLLIN)
+	stats_timer = timerfd()
+	stats_timer.settime(1, 1)
+	epoll.register(stats_timer.fileno(), eventmask=select.EPOLLIN)
+
+	# One-shot timer rearmed with the delay of every next step, so steps may have different delays.
+	# Deadlines are absolute, so time spent handling a step does not delay the following ones.
+	key_steps = parse_key_script(args.keys)
+	key_step = 0
+	key_deadline = time.monotonic() + key_steps[0][1]
+	key_timer = timerfd()
+	key_timer.settime(max(key_steps[0][1], 1e-6), 0)
+	epoll.register(key_timer.fileno(), eventmask=select.EPOLLIN)
 
 	clients = {}
+	last_report = time.monotonic()
 
 	while True:
-		epoll_events = epoll.poll(timeout=-1, maxevents=10)
+		epoll_events = epoll.poll(timeout=-1, maxevents=64)
 
 		for (fd, event_mask) in epoll_events:
 			if fd == sock.fileno():
 				# new client
 				client_sock, client_addr = sock.accept()
 				print(f"new client {client_addr[0]}:{client_addr[1]}")
+				client_sock.setblocking(False)
 				epoll.register(client_sock.fileno(), eventmask=select.EPOLLIN)
-				clients[client_sock.fileno()] = client_sock
-			elif fd == timer.fileno():
-				ticks = timer.read()
+				clients[client_sock.fileno()] = GuiClient(client_sock, client_addr)
+			elif fd == stats_timer.fileno():
+				ticks = stats_timer.read()
+				now = time.monotonic()
 				for client in clients.values():
-					client.sendall(b"LEFT_KEY_DOWN\n")
+					client.report(now - last_report)
+				last_report = now
+			elif fd == key_timer.fileno():
+				ticks = key_timer.read()
+				key = key_steps[key_step][0]
+				for client_fd, client in clients.items():
+					was_waiting = len(client.out_buffer) > 0
+					if client.send_key(key) and not was_waiting:
+						epoll.modify(client_fd, select.EPOLLIN | select.EPOLLOUT)
+				key_step = (key_step + 1) % len(key_steps)
+				key_deadline += key_steps[key_step][1]
+				key_timer.settime(max(key_deadline - time.monotonic(), 1e-6), 0)
 
 			elif fd in clients:
-				if event_mask & select.EPOLLHUP:
-					client_sock = clients[fd]
-					client_sock.close()
+				client = clients[fd]
+				closed = event_mask & (select.EPOLLHUP | select.EPOLLERR)
+				if event_mask & select.EPOLLIN:
+					try:
+						data = client.sock.recv(65536)
+						client.on_data(data, not args.quiet)
+						closed = closed or not data
+					except BlockingIOError:
+						pass
+					except OSError:
+						closed = True
+				if not closed and event_mask & select.EPOLLOUT and not client.flush():
+					epoll.modify(fd, select.EPOLLIN)
+				if closed:
+					for error in client.state.all_errors():
+						print(f"client {client.addr[0]}:{client.addr[1]}: {error}")
 					epoll.unregister(fd)
+					client.sock.close()
 					del clients[fd]
 					print("connection closed")
-					continue
-				if event_mask & select.EPOLLIN:
-					client_sock = clients[fd]
-					data = client_sock.recv(1024)
-					if len(data):
-						print(f"client data: {data}")
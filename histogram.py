@@ -0,0 +1,85 @@
+from array import array
+
+# Values are recorded in microseconds, in buckets of relative width at most 2 ** -(SUB_BUCKET_BITS - 1).
+SUB_BUCKET_BITS = 7
+_SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+_HALF = _SUB_BUCKETS >> 1
+
+
+def _bucket(value):
+	if value < _SUB_BUCKETS:
+		return value
+	shift = value.bit_length() - SUB_BUCKET_BITS
+	return shift * _HALF + (value >> shift)
+
+
+def _bucket_value(index):
+	"""
+	Highest value of the bucket.
+	"""
+	if index < _SUB_BUCKETS:
+		return index
+	shift = index // _HALF - 1
+	return ((index - shift * _HALF + 1) << shift) - 1
+
+
+class Histogram:
+	"""
+	HDR-style histogram of durations: fixed log-linear buckets, so recording is O(1) and histograms
+	of many sessions or processes merge by adding counts. Values above max_s are recorded as max_s.
+	"""
+	__slots__ = ("max_value", "counts", "count", "total", "min", "max")
+
+	def __init__(self, max_s=60.0):
+		self.max_value = int(max_s * 1e6)
+		self.reset()
+
+	def reset(self):
+		self.counts = array("Q", bytes(8 * (_bucket(self.max_value) + 1)))
+		self.count = 0
+		self.total = 0
+		self.min = self.max_value
+		self.max = 0
+
+	def record(self, value_s):
+		value = min(max(int(value_s * 1e6), 0), self.max_value)
+		self.counts[_bucket(value)] += 1
+		self.count += 1
+		self.total += value
+		self.min = min(self.min, value)
+		self.max = max(self.max, value)
+
+	def merge(self, other: "Histogram"):
+		if other.count == 0:
+			return
+		for i, c in enumerate(other.counts):
+			if c:
+				self.counts[i] += c
+		self.count += other.count
+		self.total += other.total
+		self.min = min(self.min, other.min)
+		self.max = max(self.max, other.max)
+
+	def percentile(self, p) -> float:
+		"""
+		:param p: fraction, e.g. 0.99
+		:return: value in seconds, upper bound of its bucket; 0 for an empty histogram
+		"""
+		if self.count == 0:
+			return 0.0
+		rank = max(1, int(p * self.count + 0.5))
+		seen = 0
+		for i, c in enumerate(self.counts):
+			seen += c
+			if seen >= rank:
+				return min(_bucket_value(i), self.max) / 1e6
+		return self.max / 1e6
+
+	def mean(self) -> float:
+		return self.total / self.count / 1e6 if self.count else 0.0
+
+	def __str__(self):
+		if self.count == 0:
+			return "n 0"
+		return f"n {self.count} p50 {self.percentile(0.5) * 1000:.2f}ms p99 {self.percentile(0.99) * 1000:.2f}ms " \
+			   f"p999 {self.percentile(0.999) * 1000:.2f}ms max {self.max / 1000:.2f}ms"
@@ -0,0 +1,204 @@
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import time
+import dummy_bot
+from histogram import Histogram
+import resource_sampler
+
+
+def worker(conn, args, first_bot, n_bots, n_observers, report_interval_s):
+	"""
+	Run n_bots players and n_observers observers in one epoll loop and stream
+	cumulative counters and latency and tick jitter histograms since the previous report
+	to the parent every report_interval_s.
+	"""
+	args.session += first_bot
+	args.name = f"{args.name}{first_bot}_"
+	args.bots = n_bots
+	args.observers = n_observers
+	if args.capture is not None:
+		args.capture = f"{args.capture}.{first_bot}"
+	bots, addr = dummy_bot.create_bots(args, False)
+	# One set of histograms per worker, merging per-bot histograms would cost more than the bots themselves.
+	latency = Histogram()
+	round_interval = Histogram()
+	tick_jitter = Histogram()
+	for bot in bots:
+		bot.latency = latency
+		bot.round_interval = round_interval
+		bot.tick_jitter = tick_jitter
+
+	def report():
+		conn.send({
+			"sent": sum(b.sent for b in bots),
+			"send_failures": sum(b.send_failures for b in bots),
+			"received": sum(b.received for b in bots),
+			"recv_errors": sum(b.recv_errors for b in bots),
+			"invalid_datagrams": sum(b.invalid_datagrams for b in bots),
+			"events": sum(b.events_received for b in bots),
+			"events_ahead": sum(b.events_ahead for b in bots),
+			"pending": sum(b.store.pending for b in bots),
+			"lag": max(b.lag() for b in bots),
+			"latency": latency,
+			"tick_jitter": tick_jitter,
+		})
+		latency.reset()
+		tick_jitter.reset()
+		round_interval.reset()
+
+	# terminate() from the parent then unwinds like Ctrl+C, closing capture files.
+	signal.signal(signal.SIGTERM, signal.default_int_handler)
+	try:
+		dummy_bot.run_bots(bots, report, report_interval_s)
+	except KeyboardInterrupt:
+		pass
+	finally:
+		for bot in bots:
+			if bot.capture is not None:
+				bot.capture.close()
+
+
+class Summary:
+	COUNTERS = ("sent", "send_failures", "received", "recv_errors", "invalid_datagrams", "events", "events_ahead")
+
+	def __init__(self, workers, sampler=None, clients=None, rounds_per_sec=None):
+		"""
+		:param sampler: resource_sampler.ResourceSampler of the server, its use is reported per client and round
+		"""
+		self.sampler = sampler
+		self.clients = clients
+		self.rounds_per_sec = rounds_per_sec
+		self.start = time.monotonic()
+		self.last_time = self.start
+		self.snapshots = [None] * workers
+		self.last_totals = dict.fromkeys(self.COUNTERS, 0)
+		self.latency = Histogram()
+		self.all_latency = Histogram()
+		self.tick_jitter = Histogram()
+		self.all_tick_jitter = Histogram()
+
+	def update(self, i, snapshot):
+		latency = snapshot.pop("latency")
+		tick_jitter = snapshot.pop("tick_jitter")
+		self.latency.merge(latency)
+		self.all_latency.merge(latency)
+		self.tick_jitter.merge(tick_jitter)
+		self.all_tick_jitter.merge(tick_jitter)
+		self.snapshots[i] = snapshot
+
+	def totals(self):
+		snapshots = [s for s in self.snapshots if s is not None]
+		totals = {c: sum(s[c] for s in snapshots) for c in self.COUNTERS}
+		totals["lag"] = max((s["lag"] for s in snapshots), default=0)
+		totals["pending"] = sum(s["pending"] for s in snapshots)
+		return totals
+
+	def report(self, since_start=False):
+		"""
+		Print rates since the previous report (or the whole run) and cumulative drop rates.
+		"""
+		now = time.monotonic()
+		totals = self.totals()
+		if since_start:
+			elapsed = now - self.start
+			delta = totals
+			latency = self.all_latency
+			tick_jitter = self.all_tick_jitter
+		else:
+			elapsed = now - self.last_time
+			delta = {c: totals[c] - self.last_totals[c] for c in self.COUNTERS}
+			latency = self.latency
+			tick_jitter = self.tick_jitter
+
+		packets = delta["sent"] + delta["received"]
+		attempts = totals["sent"] + totals["send_failures"]
+		send_drop = totals["send_failures"] / attempts if attempts else 0.0
+		ahead = totals["events_ahead"] / totals["events"] if totals["events"] else 0.0
+
+		print(f"{now - self.start:.1f}s packets {packets / elapsed:.0f}/s (sent {delta['sent'] / elapsed:.0f}/s "
+			  f"received {delta['received'] / elapsed:.0f}/s) events {delta['events'] / elapsed:.0f}/s "
+			  f"send drops {send_drop:.2%} out of order {ahead:.2%} pending {totals['pending']} "
+			  f"max lag {totals['lag']} recv errors {totals['recv_errors']} invalid {totals['invalid_datagrams']} "
+			  f"latency p50 {latency.percentile(0.5) * 1000:.1f}ms p99 {latency.percentile(0.99) * 1000:.1f}ms "
+			  f"p999 {latency.percentile(0.999) * 1000:.1f}ms")
+		if tick_jitter.count:
+			print(f"  tick jitter {tick_jitter}")
+		if self.sampler is not None:
+			rounds = int(elapsed * self.rounds_per_sec) if self.rounds_per_sec else None
+			resources = self.sampler.summary(self.clients, rounds, None if since_start else self.last_time)
+			print(f"  server {resource_sampler.format_summary(resources)}")
+
+		self.last_time = now
+		self.last_totals = totals
+		self.latency.reset()
+		self.tick_jitter.reset()
+
+
+def init_parser():
+	parser = dummy_bot.init_parser()
+	parser.add_argument("-w", "--workers", default=os.cpu_count(), type=int, help="worker processes")
+	parser.add_argument("-d", "--duration", default=None, type=float, help="seconds to run, forever if not set")
+	parser.add_argument("-r", "--report", default=1.0, type=float, help="report interval [s]")
+	parser.add_argument("--server-pid", default=None, type=int, help="sample CPU, memory and UDP drops of the server")
+	parser.add_argument("--sample-interval", default=0.1, type=float, help="server sampling interval [s]")
+
+	return parser
+
+
+def split(n, parts):
+	return [n // parts + (1 if i < n % parts else 0) for i in range(parts)]
+
+
+if __name__ == '__main__':
+	args = init_parser().parse_args()
+
+	workers = min(args.workers, args.bots + args.observers)
+	bots_split = split(args.bots, workers)
+	observers_split = split(args.observers, workers)
+	# Both splits put remainders first, so only trailing workers can be left empty.
+	workers = sum(1 for b, o in zip(bots_split, observers_split) if b + o > 0)
+
+	processes = []
+	conns = []
+	first_bot = 0
+	for i in range(workers):
+		parent_conn, child_conn = multiprocessing.Pipe(duplex=False)
+		p = multiprocessing.Process(target=worker, args=(child_conn, args, first_bot, bots_split[i],
+														  observers_split[i], args.report), daemon=True)
+		p.start()
+		processes.append(p)
+		conns.append(parent_conn)
+		first_bot += bots_split[i] + observers_split[i]
+
+	print(f"{args.bots} bots and {args.observers} observers in {workers} workers")
+
+	sampler = None
+	if args.server_pid is not None:
+		sampler = resource_sampler.ResourceSampler(args.server_pid, int(args.port), args.sample_interval).start()
+	summary = Summary(workers, sampler, args.bots + args.observers, args.rounds_per_sec)
+	next_report = time.monotonic() + args.report
+	# connection -> worker index, workers that died are removed.
+	workers_by_conn = {conn: i for i, conn in enumerate(conns)}
+	try:
+		while workers_by_conn and (args.duration is None or time.monotonic() - summary.start < args.duration):
+			for conn in multiprocessing.connection.wait(list(workers_by_conn), timeout=args.report):
+				try:
+					summary.update(workers_by_conn[conn], conn.recv())
+				except EOFError:
+					i = workers_by_conn.pop(conn)
+					processes[i].join(1)
+					print(f"worker {i} died (exit code {processes[i].exitcode}), its last report is kept")
+			if time.monotonic() >= next_report:
+				next_report += args.report
+				summary.report()
+	except KeyboardInterrupt:
+		pass
+	if not workers_by_conn:
+		print("all workers died")
+
+	for p in processes:
+		p.terminate()
+	print("total:")
+	summary.report(since_start=True)
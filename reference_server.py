@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+import argparse
+import math
+import select
+import socket
+import struct
+import time
+from array import array
+from typing import Dict, List, Optional
+import communication
+
+MAX_PLAYERS = 25
+MAX_NAME_LEN = 20
+CLIENT_TIMEOUT = 2.0
+
+_CTS_HEADER = struct.Struct("!QBI")
+
+
+class Rng:
+	"""
+	Screen worms random number generator, the first call returns the seed.
+	"""
+
+	def __init__(self, seed):
+		self.value = seed
+
+	def rand(self):
+		value = self.value
+		self.value = (self.value * 279410273) % 4294967291
+		return value
+
+
+class Game:
+	"""
+	Game rules without networking and timing, one round per call of round().
+	Events are kept both as EventBatch and as encoded bytes ready to be packed into datagrams.
+	"""
+
+	def __init__(self, rng, width, height, players_names, turning_speed=6):
+		self.game_id = rng.rand()
+		self.width = width
+		self.height = height
+		self.players_names = sorted(players_names)
+		self.turning_speed = turning_speed
+
+		self.board = bytearray(width * height)
+		self.x = array("d")
+		self.y = array("d")
+		self.direction = array("l")
+		self.alive = bytearray(len(self.players_names))
+		self.alive_count = 0
+		self.over = False
+
+		self.events = communication.EventBatch()
+		self.encoded = []
+
+		self.add_event(0, communication.DataNewGame(width, height, list(self.players_names)))
+		for i in range(len(self.players_names)):
+			self.x.append(rng.rand() % width + 0.5)
+			self.y.append(rng.rand() % height + 0.5)
+			self.direction.append(rng.rand() % 360)
+			self.alive[i] = 1
+			self.alive_count += 1
+		for i in range(len(self.players_names)):
+			if self.over:
+				break
+			self.enter_pixel(i, int(self.x[i]), int(self.y[i]))
+
+	def add_event(self, event_type, event_data):
+		event = communication.Event(-1, len(self.encoded), event_type, event_data, -1)
+		buffer = bytearray(communication.stc_event_size(event))
+		communication.serialize_stc_event_into(buffer, 0, event)
+		event.event_len = len(buffer) - 8
+		event.crc32 = int.from_bytes(buffer[-4:], "big")
+
+		self.events.append(event)
+		self.encoded.append(bytes(buffer))
+
+	def eliminate(self, i):
+		self.alive[i] = 0
+		self.alive_count -= 1
+		self.add_event(2, communication.DataPlayerEliminated(i))
+		if self.alive_count == 1:
+			self.add_event(3, None)
+			self.over = True
+
+	def enter_pixel(self, i, px, py):
+		if px < 0 or py < 0 or px >= self.width or py >= self.height or self.board[py * self.width + px]:
+			self.eliminate(i)
+		else:
+			self.board[py * self.width + px] = 1
+			self.add_event(1, communication.DataPixel(i, px, py))
+
+	def round(self, turn_directions):
+		"""
+		:param turn_directions: turn_direction of every player
+		"""
+		for i in range(len(self.players_names)):
+			if self.over:
+				return
+			if not self.alive[i]:
+				continue
+
+			if turn_directions[i] == 1:
+				self.direction[i] += self.turning_speed
+			elif turn_directions[i] == 2:
+				self.direction[i] -= self.turning_speed
+
+			old_x = math.floor(self.x[i])
+			old_y = math.floor(self.y[i])
+			angle = self.direction[i] * math.pi / 180
+			self.x[i] += math.cos(angle)
+			self.y[i] += math.sin(angle)
+			px = math.floor(self.x[i])
+			py = math.floor(self.y[i])
+			if px != old_x or py != old_y:
+				self.enter_pixel(i, px, py)
+
+	def datagrams(self, first_event_no=0, last_event_no=None) -> List[bytes]:
+		"""
+		Pack encoded events [first_event_no, last_event_no) greedily into datagrams.
+		"""
+		if last_event_no is None:
+			last_event_no = len(self.encoded)
+		game_id = self.game_id.to_bytes(4, "big")
+		datagrams = []
+		parts = [game_id]
+		size = len(game_id)
+		for b_event in self.encoded[first_event_no:last_event_no]:
+			if size + len(b_event) > communication.MAX_STC_MESSAGE_LEN:
+				datagrams.append(b"".join(parts))
+				parts = [game_id]
+				size = len(game_id)
+			parts.append(b_event)
+			size += len(b_event)
+		if len(parts) > 1:
+			datagrams.append(b"".join(parts))
+		return datagrams
+
+
+def simulate(seed, width, height, turn_directions: Dict[str, int], rounds, turning_speed=6) -> Game:
+	"""
+	Accelerated mode: play a game of players with fixed turn directions without real-time waits.
+	:param turn_directions: player name -> turn_direction
+	:param rounds: maximum number of rounds
+	:return: finished game, its events and datagrams are available as in the server
+	"""
+	game = Game(Rng(seed), width, height, list(turn_directions), turning_speed)
+	turns = [turn_directions[name] for name in game.players_names]
+	for _ in range(rounds):
+		if game.over:
+			break
+		game.round(turns)
+	return game
+
+
+class ClientState:
+	def __init__(self, session_id, name, now):
+		self.session_id = session_id
+		self.name = name
+		self.turn_direction = 0
+		self.ready = False
+		self.last_seen = now
+
+
+def parse_cts_message(b_message):
+	"""
+	:return: (session_id, turn_direction, next_expected_event_no, player_name) or None for invalid message
+	"""
+	if len(b_message) < _CTS_HEADER.size or len(b_message) > _CTS_HEADER.size + MAX_NAME_LEN:
+		return None
+	session_id, turn_direction, next_expected_event_no = _CTS_HEADER.unpack_from(b_message)
+	b_name = b_message[_CTS_HEADER.size:]
+	if turn_direction > 2 or any(c < 33 or c > 126 for c in b_name):
+		return None
+	return session_id, turn_direction, next_expected_event_no, bytes.decode(b_name)
+
+
+class Server:
+	def __init__(self, port=2021, seed=None, turning_speed=6, rounds_per_sec=50, width=640, height=480):
+		self.rng = Rng(int(time.time()) if seed is None else seed)
+		self.turning_speed = turning_speed
+		self.round_time = 1.0 / rounds_per_sec
+		self.width = width
+		self.height = height
+
+		self.clients: Dict[tuple, ClientState] = {}
+		self.game: Optional[Game] = None
+		self.game_turns = []
+		self.next_round = 0.0
+
+		try:
+			self.sock = socket.socket(socket.AF_INET6, socket.SOCK_DGRAM)
+			self.sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 0)
+			self.sock.bind(("::", port))
+		except OSError:
+			self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+			self.sock.bind(("", port))
+		self.sock.setblocking(False)
+
+	def send(self, datagrams, addresses):
+		for datagram in datagrams:
+			for addr in addresses:
+				try:
+					self.sock.sendto(datagram, addr)
+				except OSError:
+					pass
+
+	def on_message(self, b_message, addr, now):
+		message = parse_cts_message(b_message)
+		if message is None:
+			return
+		session_id, turn_direction, next_expected_event_no, name = message
+
+		client = self.clients.get(addr)
+		if client is not None and session_id < client.session_id:
+			return
+		if client is None or session_id > client.session_id:
+			if client is None and len(self.clients) >= MAX_PLAYERS:
+				return
+			if name and any(c.name == name for a, c in self.clients.items() if a != addr):
+				return
+			client = ClientState(session_id, name, now)
+			self.clients[addr] = client
+
+		client.last_seen = now
+		client.turn_direction = turn_direction
+		if turn_direction != 0:
+			client.ready = True
+
+		if self.game is not None:
+			self.send(self.game.datagrams(next_expected_event_no), [addr])
+
+	def maybe_start_game(self, now):
+		if self.game is not None and not self.game.over:
+			return
+		players = [c for c in self.clients.values() if c.name]
+		if len(players) < 2 or not all(c.ready for c in players):
+			return
+
+		self.game = Game(self.rng, self.width, self.height, [c.name for c in players], self.turning_speed)
+		self.game_turns = [0] * len(self.game.players_names)
+		self.next_round = now + self.round_time
+		self.send(self.game.datagrams(), list(self.clients))
+		if self.game.over:
+			self.end_game()
+
+	def end_game(self):
+		for client in self.clients.values():
+			client.ready = False
+
+	def play_round(self):
+		by_name = {c.name: c for c in self.clients.values() if c.name}
+		for i, name in enumerate(self.game.players_names):
+			if name in by_name:
+				self.game_turns[i] = by_name[name].turn_direction
+
+		first = len(self.game.encoded)
+		self.game.round(self.game_turns)
+		self.send(self.game.datagrams(first), list(self.clients))
+		if self.game.over:
+			self.end_game()
+
+	def run(self):
+		epoll = select.epoll()
+		epoll.register(self.sock.fileno(), eventmask=select.EPOLLIN)
+
+		while True:
+			now = time.monotonic()
+			timeout = 0.1
+			if self.game is not None and not self.game.over:
+				timeout = max(0.0, min(timeout, self.next_round - now))
+			epoll.poll(timeout=timeout)
+
+			now = time.monotonic()
+			while True:
+				try:
+					b_message, addr = self.sock.recvfrom(communication.RECV_BUFFER_SIZE)
+				except BlockingIOError:
+					break
+				self.on_message(b_message, addr, now)
+
+			for addr in [a for a, c in self.clients.items() if now - c.last_seen >= CLIENT_TIMEOUT]:
+				del self.clients[addr]
+
+			while self.game is not None and not self.game.over and now >= self.next_round:
+				self.play_round()
+				self.next_round += self.round_time
+
+			self.maybe_start_game(now)
+
+
+def init_parser():
+	# -h is the board height, as in the screen worms server.
+	parser = argparse.ArgumentParser(add_help=False)
+	parser.add_argument("--help", action="help")
+	parser.add_argument("-p", "--port", default=2021, type=int)
+	parser.add_argument("-s", "--seed", default=None, type=int)
+	parser.add_argument("-t", "--turning-speed", default=6, type=int)
+	parser.add_argument("-v", "--rounds-per-sec", default=50, type=int)
+	parser.add_argument("-w", "--width", default=640, type=int)
+	parser.add_argument("-h", "--height", default=480, type=int)
+	parser.add_argument("--simulate", default=None, type=int, metavar="ROUNDS",
+						help="play ROUNDS rounds of a 2 player game without networking and print its speed")
+
+	return parser
+
+
+if __name__ == '__main__':
+	args = init_parser().parse_args()
+
+	if args.simulate is not None:
+		start = time.perf_counter()
+		game = simulate(args.seed or 0, args.width, args.height, {"Ala": 1, "Bob": 2}, args.simulate,
+						args.turning_speed)
+		elapsed = time.perf_counter() - start
+		print(f"{len(game.events)} events in {elapsed:.3f}s, {len(game.events) / elapsed:.0f} events/s")
+	else:
+		Server(args.port, args.seed, args.turning_speed, args.rounds_per_sec, args.width, args.height).run()
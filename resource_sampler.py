@@ -0,0 +1,152 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+@dataclass
+class ResourceSample:
+	__slots__ = ("time", "cpu_s", "rss_kb", "threads", "voluntary_switches", "involuntary_switches",
+				 "rx_queue", "udp_drops")
+	time: float
+	cpu_s: float
+	rss_kb: int
+	threads: int
+	voluntary_switches: int
+	involuntary_switches: int
+	rx_queue: int
+	udp_drops: int
+
+
+def read_udp_socket(port):
+	"""
+	Sum receive queue and drop counters of UDP sockets bound to the port, from /proc/net/udp and udp6.
+	:return: (rx_queue bytes, drops)
+	"""
+	rx_queue = 0
+	drops = 0
+	for path in ("/proc/net/udp", "/proc/net/udp6"):
+		try:
+			with open(path) as f:
+				next(f)  # header
+				for line in f:
+					fields = line.split()
+					if int(fields[1].rsplit(":", 1)[1], 16) == port:
+						rx_queue += int(fields[4].split(":")[1], 16)
+						drops += int(fields[-1])
+		except FileNotFoundError:
+			pass
+	return rx_queue, drops
+
+
+def read_sample(pid, port=None) -> ResourceSample:
+	"""
+	:param port: UDP port of the process, socket counters are 0 if None
+	"""
+	now = time.monotonic()
+	with open(f"/proc/{pid}/stat") as f:
+		# Fields after the command name, which may contain spaces; stat field 3 is fields[0].
+		fields = f.read().rsplit(")", 1)[1].split()
+	cpu_s = (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS
+	threads = int(fields[17])
+
+	status = {}
+	with open(f"/proc/{pid}/status") as f:
+		for line in f:
+			key, _, value = line.partition(":")
+			status[key] = value
+	rss_kb = int(status.get("VmRSS", "0 kB").split()[0])
+
+	rx_queue, drops = read_udp_socket(port) if port is not None else (0, 0)
+	return ResourceSample(now, cpu_s, rss_kb, threads, int(status.get("voluntary_ctxt_switches", 0)),
+						  int(status.get("nonvoluntary_ctxt_switches", 0)), rx_queue, drops)
+
+
+class ResourceSampler:
+	"""
+	Background thread sampling CPU time, RSS, context switches and UDP socket counters of a process.
+	Sampling ends with stop() or when the process exits.
+	"""
+
+	def __init__(self, pid, port=None, interval_s=0.05):
+		self.pid = pid
+		self.port = port
+		self.interval_s = interval_s
+		self.samples: List[ResourceSample] = []
+		self.stopped = threading.Event()
+		self.thread = threading.Thread(target=self.run, daemon=True)
+
+	def start(self):
+		self.thread.start()
+		return self
+
+	def stop(self):
+		self.stopped.set()
+		self.thread.join()
+
+	def run(self):
+		while True:
+			try:
+				self.samples.append(read_sample(self.pid, self.port))
+			except OSError:
+				break  # Process exited.
+			if self.stopped.wait(self.interval_s):
+				break
+
+	def summary(self, clients=None, rounds=None, since=None) -> Optional[dict]:
+		"""
+		Resource use and its time series over the sampled period, None with fewer than 2 samples.
+		:param clients: number of connected clients, adds cost per client
+		:param rounds: number of game rounds played, adds cost per round
+		:param since: time.monotonic() of the period start, the whole sampling by default
+		"""
+		samples = self.samples if since is None else [s for s in self.samples if s.time >= since]
+		if len(samples) < 2:
+			return None
+		first = samples[0]
+		last = samples[-1]
+		elapsed = last.time - first.time
+		cpu_s = last.cpu_s - first.cpu_s
+		result = {
+			"samples": len(samples),
+			"elapsed_s": elapsed,
+			"cpu_s": cpu_s,
+			"cpu_percent": 100.0 * cpu_s / elapsed if elapsed > 0 else 0.0,
+			"peak_rss_kb": max(s.rss_kb for s in samples),
+			"peak_threads": max(s.threads for s in samples),
+			"voluntary_switches": last.voluntary_switches - first.voluntary_switches,
+			"involuntary_switches": last.involuntary_switches - first.involuntary_switches,
+			"peak_rx_queue": max(s.rx_queue for s in samples),
+			"udp_drops": last.udp_drops - first.udp_drops,
+			# (seconds, cpu seconds, rss kB, rx queue bytes, udp drops) since the first sample.
+			"series": [
+				(s.time - first.time, s.cpu_s - first.cpu_s, s.rss_kb, s.rx_queue, s.udp_drops - first.udp_drops)
+				for s in samples
+			],
+		}
+		if clients:
+			result["cpu_ms_per_client"] = cpu_s * 1000 / clients
+		if rounds:
+			result["cpu_us_per_round"] = cpu_s * 1e6 / rounds
+			if clients:
+				result["cpu_us_per_client_round"] = cpu_s * 1e6 / rounds / clients
+		return result
+
+
+def format_summary(summary: Optional[dict]) -> str:
+	if summary is None:
+		return "no resource samples"
+	s = f"cpu {summary['cpu_s'] * 1000:.1f}ms ({summary['cpu_percent']:.1f}%) " \
+		f"peak rss {summary['peak_rss_kb']}kB threads {summary['peak_threads']} " \
+		f"ctx switches {summary['voluntary_switches']}+{summary['involuntary_switches']} " \
+		f"peak rx queue {summary['peak_rx_queue']}B udp drops {summary['udp_drops']}"
+	if "cpu_ms_per_client" in summary:
+		s += f" cpu/client {summary['cpu_ms_per_client']:.2f}ms"
+	if "cpu_us_per_round" in summary:
+		s += f" cpu/round {summary['cpu_us_per_round']:.0f}us"
+	if "cpu_us_per_client_round" in summary:
+		s += f" cpu/client/round {summary['cpu_us_per_client_round']:.0f}us"
+	return s
@@ -4,12 +4,30 @@ import communication
 import socket
 import time
 from typing import List
+from collections import Counter
 import itertools
 import select
 import configparser
+import os
+import capture
+import resource_sampler
+import wire_analyzer
+from communication import event_new_game, event_pixel
 
 config = configparser.ConfigParser()
 
+# Maximum number of datagrams Client receives between parsing them.
+RECV_BATCH = 32
+
+# test id -> seconds from starting the server until it bound its port.
+server_startup_times = {}
+
+# test id -> resource_sampler summary of the server, with RESOURCE_SAMPLE_INTERVAL set.
+resource_summaries = {}
+
+# test id -> wire_analyzer report of datagrams received by the test clients, with WIRE_ANALYSIS set.
+wire_reports = {}
+
 
 def start_server(port, args):
 	"""
@@ -23,6 +41,50 @@ def start_server(port, args):
 	return subprocess.Popen([config.get("TESTS_200", "SERVER_PATH")] + [f"-p {port}"] + args, stdout=out, stderr=err)
 
 
+def udp_port_bound(port):
+	"""
+	Check /proc/net/udp and /proc/net/udp6 for a socket bound to the port.
+	:return: True or False, None if neither file exists
+	"""
+	found_file = False
+	for path in ("/proc/net/udp", "/proc/net/udp6"):
+		try:
+			with open(path) as f:
+				found_file = True
+				next(f)  # header
+				for line in f:
+					local_address = line.split()[1]
+					if int(local_address.rsplit(":", 1)[1], 16) == port:
+						return True
+		except FileNotFoundError:
+			pass
+	return False if found_file else None
+
+
+def wait_server_ready(server, port, start=None):
+	"""
+	Wait until the server binds its UDP port, or SERVER_INIT_TIME where /proc/net/udp is not available.
+	:param start: time.monotonic() when the server was spawned, now by default; for a server that has
+		already bound its port the result is only an upper bound of its startup time
+	:return: startup time in seconds
+	"""
+	if start is None:
+		start = time.monotonic()
+	timeout = config.getfloat("TESTS_200", "SERVER_INIT_TIMEOUT")
+	while True:
+		bound = udp_port_bound(port)
+		if bound is None:
+			time.sleep(max(0.0, config.getfloat("TESTS_200", "SERVER_INIT_TIME") - (time.monotonic() - start)))
+			return time.monotonic() - start
+		if bound:
+			return time.monotonic() - start
+		if server.poll() is not None:
+			raise RuntimeError(f"server exited with code {server.returncode}")
+		if time.monotonic() - start > timeout:
+			raise TimeoutError(f"server did not bind port {port} in {timeout}s")
+		time.sleep(0.001)
+
+
 def stop_server(server):
 	server.kill()
 	server.communicate()
@@ -65,6 +127,20 @@ class Client:
 		if not connected:
 			raise ConnectionError("Cannot connect to the server")
 
+		self.epoll = select.epoll()
+		self.epoll.register(self.sock.fileno(), eventmask=select.EPOLLIN)
+
+		# Datagrams are received in batches into these buffers and parsed after each batch.
+		self.recv_views = [memoryview(bytearray(communication.RECV_BUFFER_SIZE)) for _ in range(RECV_BATCH)]
+
+		self.capture = None
+		capture_dir = config.get("TESTS_200_DEBUG", "CAPTURE_DIR", fallback="")
+		if capture_dir:
+			self.capture = capture.CaptureWriter(os.path.join(capture_dir, f"{server_port}_{session_id}.cap"))
+		self.wire_stats = None
+		if config.getboolean("TESTS_200_DEBUG", "WIRE_ANALYSIS", fallback=False):
+			self.wire_stats = wire_analyzer.ClientWireStats()
+
 	def send_message(self, turn_direction, next_expected_event_no=0):
 		msg = communication.serialize_cts_message(self.session_id, turn_direction, next_expected_event_no,
 												  self.player_name)
@@ -73,65 +149,170 @@ class Client:
 
 	def recv_message(self):
 		try:
-			b_message = self.sock.recv(1024, socket.MSG_DONTWAIT)
+			n = self.sock.recv_into(self.recv_views[0], 0, socket.MSG_DONTWAIT)
 		except BlockingIOError:
 			return None
-		return communication.deserialize_stc_message(b_message)
+		self.on_datagram(self.recv_views[0][:n])
+		return communication.deserialize_stc_message(self.recv_views[0][:n],
+													 config.getboolean("TESTS_200", "STRICT_VALIDATION"))
 
-	def pull_events(self):
-		epoll = select.epoll()
-		epoll.register(self.sock.fileno(), eventmask=select.EPOLLIN)
+	def recv_batch(self) -> List[communication.ServerMessage]:
+		"""
+		Receive up to RECV_BATCH datagrams that are already queued, without blocking.
+		"""
+		lengths = []
+		for view in self.recv_views:
+			try:
+				lengths.append(self.sock.recv_into(view, 0, socket.MSG_DONTWAIT))
+			except BlockingIOError:
+				break
+		for view, n in zip(self.recv_views, lengths):
+			self.on_datagram(view[:n])
+
+		strict = config.getboolean("TESTS_200", "STRICT_VALIDATION")
+		return [communication.deserialize_stc_message(view[:n], strict) for view, n in zip(self.recv_views, lengths)]
+
+	def on_datagram(self, b_message):
+		"""
+		Pass received datagram to capture and wire analysis, when enabled.
+		"""
+		if self.capture is not None:
+			self.capture.write(b_message)
+		if self.wire_stats is not None:
+			self.wire_stats.add(b_message, time.monotonic())
 
+	def pull_events(self):
 		server_messages = []
 		while True:
-			events = epoll.poll(timeout=config.getfloat("TESTS_200", "EPOLL_TIMEOUT"), maxevents=-1)
+			events = self.epoll.poll(timeout=config.getfloat("TESTS_200", "EPOLL_TIMEOUT"), maxevents=1)
 			if len(events) == 0:
 				break
-			for (fd, mask) in events:
-				b_message = self.sock.recv(1024)
-				server_messages.append(communication.deserialize_stc_message(b_message))
-		epoll.close()
+			server_messages += self.recv_batch()
 		return server_messages
 
+	def pull_events_until(self, condition, timeout):
+		"""
+		Receive messages until condition holds or timeout passes, then drain what is already queued.
+		:param condition: called with the list of messages received so far
+		:param timeout: maximum wait in seconds
+		:return: all received messages
+		"""
+		deadline = time.monotonic() + timeout
+		server_messages = []
+		while not condition(server_messages):
+			remaining = deadline - time.monotonic()
+			if remaining <= 0:
+				break
+			if self.epoll.poll(timeout=remaining, maxevents=1):
+				server_messages += self.recv_batch()
+		return server_messages + self.pull_events()
+
 	def close(self):
+		if self.capture is not None:
+			self.capture.close()
+		self.epoll.close()
 		self.sock.close()
 
 
-def event_new_game(event_no, width, height, players):
-	return communication.Event(-1, event_no, 0, communication.DataNewGame(width, height, players), -1)
+def index_events(server_messages: List[communication.ServerMessage]) -> Counter:
+	"""
+	Multiset of received events, to count occurrences of an event in O(1).
+	"""
+	return Counter(map(communication.event_key, get_events(server_messages)))
+
+
+def index_new_events(index: Counter):
+	"""
+	Keep index up to date with a growing list of messages, each message is indexed once.
+	:return: function adding messages appended to the list since its previous call and returning index
+	"""
+	indexed = 0
+
+	def update(server_messages: List[communication.ServerMessage]) -> Counter:
+		nonlocal indexed
+		index.update(map(communication.event_key, get_events(server_messages[indexed:])))
+		indexed = len(server_messages)
+		return index
+
+	return update
+
+
+def contains_events(expected: communication.ServerMessage):
+	"""
+	:return: condition for Client.pull_events_until, true once all expected events were received
+	"""
+	keys = [communication.event_key(e) for e in expected.events]
+	update = index_new_events(Counter())
+
+	def condition(received: List[communication.ServerMessage]):
+		index = update(received)
+		return all(index[key] >= 1 for key in keys)
+
+	return condition
 
 
-def event_pixel(event_no, player_no, x, y):
-	return communication.Event(-1, event_no, 1, communication.DataPixel(player_no, x, y), -1)
+def server_args(seed, width=800, height=600, rounds_per_sec=2):
+	"""
+	Declare server parameters of a test, so that its server can be started (or pre-spawned) before the test runs.
+	"""
 
+	def decorator(test):
+		test.server_args = [f"-s {seed}", f"-v {rounds_per_sec}", f"-w {width}", f"-h {height}"]
+		return test
 
-def event_player_eliminated(event_on, player_no):
-	return communication.Event(-1, event_on, 2, communication.DataPlayerEliminated(player_no), -1)
+	return decorator
 
 
-def event_game_over(event_no):
-	return communication.Event(-1, event_no, 3, None, -1)
+def server_port(test_name):
+	# for test_xxx, server port = 20xxx.
+	return 20000 + int(test_name.split("_")[1])
 
 
-def events_equal(e1: communication.Event, e2: communication.Event):
-	return e1.event_no == e2.event_no and e1.event_type == e2.event_type and e1.event_data == e2.event_data
+# port -> (server arguments, server process, time.monotonic() of spawning it) started ahead of the tests,
+# see tests_200_parallel.py.
+prespawned_servers = {}
 
 
 class TestServer200(unittest.TestCase):
 	"""
-	Does not check event_len and crc32!!!
+	Checks event_len and crc32 of received events only with STRICT_VALIDATION enabled.
 	"""
 
 	def setUp(self) -> None:
 		self.next_session_id = 0
-		# for test_xxx, server port = 20xxx.
-		self.port = 20000 + int(self._testMethodName.split("_")[1])
+		self.clients = []
+		self.port = server_port(self._testMethodName)
+		self.server = self.start_server(getattr(self, self._testMethodName).server_args)
+
+		self.sampler = None
+		interval = config.getfloat("TESTS_200_DEBUG", "RESOURCE_SAMPLE_INTERVAL", fallback=0.0)
+		if interval > 0:
+			self.sampler = resource_sampler.ResourceSampler(self.server.pid, self.port, interval).start()
 
 	def tearDown(self):
+		if self.sampler is not None:
+			self.sampler.stop()
+			self.record_resources()
+		wire_stats = {f"client {c.session_id} {c.player_name}": c.wire_stats for c in self.clients if c.wire_stats}
+		if wire_stats:
+			wire_reports[self.id()] = wire_analyzer.report(wire_stats)
+			print(f"{self.id()}:\n{wire_reports[self.id()]}")
 		for c in self.clients:
 			c.close()
 		stop_server(self.server)
 
+	def record_resources(self):
+		"""
+		Store server resource use of the test, rounds are counted as if a game ran for the whole test.
+		"""
+		args = getattr(self, self._testMethodName).server_args
+		rounds_per_sec = int(next(a for a in args if a.startswith("-v")).split()[1])
+		elapsed = self.sampler.samples[-1].time - self.sampler.samples[0].time if self.sampler.samples else 0.0
+		summary = self.sampler.summary(len(self.clients), int(elapsed * rounds_per_sec))
+		resource_summaries[self.id()] = summary
+		if config.getboolean("TESTS_200_DEBUG", "PRINT_RESOURCE_SUMMARY", fallback=False):
+			print(f"{self.id()}: {resource_sampler.format_summary(summary)}")
+
 	def assertContainsEvents(self, expected: communication.ServerMessage, received: List[communication.ServerMessage]):
 		if config.getboolean("TESTS_200_DEBUG", "PRINT_RECEIVED_MESSAGES"):
 			print_events(received)
@@ -139,9 +320,9 @@ class TestServer200(unittest.TestCase):
 		for m in received:
 			self.assertEqual(expected.game_id, m.game_id, "Incorrect game id")
 
-		rec_events: List[communication.Event] = get_events(received)
+		index = index_events(received)
 		for e in expected.events:
-			num = len(list(filter(lambda x: events_equal(e, x), rec_events)))
+			num = index[communication.event_key(e)]
 			self.assertLessEqual(1, num, f"Event {e} not found")
 
 	def new_client(self, name, ip=socket.AF_INET):
@@ -152,34 +333,51 @@ class TestServer200(unittest.TestCase):
 		return list(map(lambda name: self.new_client(name, ip), names))
 
 	def assertClientReceived(self, client: Client, expected: communication.ServerMessage):
-		received = client.pull_events()
+		received = self.wait_events(client, expected)
 		self.assertContainsEvents(expected, received)
 
 	def assertClientsReceived(self, clients: List[Client], expected: communication.ServerMessage):
 		for client in clients:
 			self.assertClientReceived(client, expected)
 
-	def start_server(self, seed, width=800, height=600, rounds_per_sec=2):
-		args = [f"-s {seed}", f"-v {rounds_per_sec}", f"-w {width}", f"-h {height}"]
-		s = start_server(self.port, args)
-		time.sleep(config.getfloat("TESTS_200", "SERVER_INIT_TIME"))  # Wait for server to start.
+	def start_server(self, args):
+		s = None
+		if self.port in prespawned_servers:
+			prespawned_args, s, spawn_time = prespawned_servers.pop(self.port)
+			if prespawned_args != args or s.poll() is not None:
+				stop_server(s)
+				s = None
+		if s is None:
+			spawn_time = time.monotonic()
+			s = start_server(self.port, args)
+		try:
+			self.server_startup_time = wait_server_ready(s, self.port, spawn_time)
+		except (RuntimeError, TimeoutError):
+			stop_server(s)
+			raise
+		server_startup_times[self.id()] = self.server_startup_time
+		if config.getboolean("TESTS_200_DEBUG", "PRINT_SERVER_STARTUP_TIME"):
+			print(f"{self.id()}: server started in {self.server_startup_time * 1000:.1f}ms")
 		return s
 
-	def wait_server(self):
-		time.sleep(config.getfloat("TESTS_200", "SERVER_RUN_TIME"))
+	def wait_events(self, client: Client, expected: communication.ServerMessage):
+		"""
+		Receive messages until client got all expected events or EVENTS_TIMEOUT passes.
+		"""
+		timeout = config.getfloat("TESTS_200", "EVENTS_TIMEOUT")
+		return client.pull_events_until(contains_events(expected), timeout)
 
+	@server_args(777)
 	def test_201(self):
 		"""
 		Parametry serwera: -v 2 -s 777 -w 800 -h 600
 		Klient 0: turn_direction = 1, next_expected_event_no = 0, player_name = Bob201
 		Klient 1: turn_direction = 2, next_expected_event_no = 0, player_name = Cezary201
 		"""
-		self.server = self.start_server(777)
 		self.clients = self.new_clients(["Bob201", "Cezary201"])
 
 		self.clients[0].send_message(1, 0)
 		self.clients[1].send_message(2, 0)
-		self.wait_server()
 
 		expected_events = communication.ServerMessage(777, [
 			event_new_game(0, 800, 600, ["Bob201", "Cezary201"]),
@@ -191,6 +389,7 @@ class TestServer200(unittest.TestCase):
 
 		self.assertClientsReceived(self.clients, expected_events)
 
+	@server_args(3, 100, 200)
 	def test_202(self):
 		"""
 		Parametry serwera: -v 2 -s 3 -h 200 -w 100
@@ -198,13 +397,11 @@ class TestServer200(unittest.TestCase):
 		Klient 1: turn_direction = 0, next_expected_event_no = 0, bez nazwy gracza
 		Klient 2: turn_direction = 2, next_expected_event_no = 0, player_name = Cezary202
 		"""
-		self.server = self.start_server(3, 100, 200)
 		self.clients = self.new_clients(["Bob202", "", "Cezary202"])
 
 		self.clients[0].send_message(1, 0)
 		self.clients[1].send_message(0, 0)
 		self.clients[2].send_message(2, 0)
-		self.wait_server()
 
 		expected_events = communication.ServerMessage(3, [
 			event_new_game(0, 100, 200, ["Bob202", "Cezary202"]),
@@ -216,6 +413,7 @@ class TestServer200(unittest.TestCase):
 
 		self.assertClientsReceived(self.clients, expected_events)
 
+	@server_args(2)
 	def test_203(self):
 		"""
 		Parametry serwera: -v 2 -s 2 -w 800 -h 600
@@ -223,13 +421,11 @@ class TestServer200(unittest.TestCase):
 		Klient 1: za krótki komunikat – jeden bajt o wartości 0
 		Klient 2: turn_direction = 2, next_expected_event_no = 0, player_name = Cezary203
 		"""
-		self.server = self.start_server(2)
 		self.clients = self.new_clients(["Bob203", "", "Cezary203"])
 
 		self.clients[0].send_message(1, 0)
 		self.clients[1].sock.send(b"\0")
 		self.clients[2].send_message(2, 0)
-		self.wait_server()
 
 		expected_events = communication.ServerMessage(2, [
 			event_new_game(0, 800, 600, ["Bob203", "Cezary203"]),
@@ -242,18 +438,17 @@ class TestServer200(unittest.TestCase):
 		self.assertClientReceived(self.clients[0], expected_events)
 		self.assertClientReceived(self.clients[2], expected_events)
 
+	@server_args(777)
 	def test_204(self):
 		"""
 		Parametry serwera: -v 2 -s 777 -w 800 -h 600
 		Klient 0: turn_direction = 1, next_expected_event_no = 0, player_name = Bob205, używa IPv6
 		Klient 1: turn_direction = 2, next_expected_event_no = 0, player_name = Cezary205, używa IPv6
 		"""
-		self.server = self.start_server(777)
 		self.clients = self.new_clients(["Bob201", "Cezary201"], socket.AF_INET6)
 
 		self.clients[0].send_message(1, 0)
 		self.clients[1].send_message(2, 0)
-		self.wait_server()
 
 		expected_events = communication.ServerMessage(777, [
 			event_new_game(0, 800, 600, ["Bob201", "Cezary201"]),
@@ -265,6 +460,7 @@ class TestServer200(unittest.TestCase):
 
 		self.assertClientsReceived(self.clients, expected_events)
 
+	@server_args(65535, 2048, 2048)
 	def test_205(self):
 		"""
 		Parametry serwera: -v 2 -s 65535 -h 2048 -w 2048
@@ -272,12 +468,10 @@ class TestServer200(unittest.TestCase):
 		Klient 1: turn_direction = 2, next_expected_event_no = 0, player_name = Ala206, używa IPv6
 		Sprawdza sortowanie nazw graczy.
 		"""
-		self.server = self.start_server(65535, 2048, 2048)
 		self.clients = self.new_clients(["Bob206", "Ala206"], socket.AF_INET6)
 
 		self.clients[0].send_message(1, 0)
 		self.clients[1].send_message(2, 0)
-		self.wait_server()
 
 		expected_events = communication.ServerMessage(65535, [
 			event_new_game(0, 2048, 2048, ["Ala206", "Bob206"]),
@@ -289,6 +483,7 @@ class TestServer200(unittest.TestCase):
 
 		self.assertClientsReceived(self.clients, expected_events)
 
+	@server_args(7)
 	def test_206(self):
 		"""
 		Parametry serwera: -v 2 -s 7 -w 800 -h 600
@@ -297,13 +492,11 @@ class TestServer200(unittest.TestCase):
 		Klient 2: turn_direction = 2, next_expected_event_no = 0, player_name = Bob207
 		Klient 0 wysyła błędną wartość turn_direction.
 		"""
-		self.server = self.start_server(7)
 		self.clients = self.new_clients(["Cezary207", "Ala207", "Bob207"])
 
 		self.clients[0].send_message(3, 0)
 		self.clients[1].send_message(1, 0)
 		self.clients[2].send_message(2, 0)
-		self.wait_server()
 
 		expected_events = communication.ServerMessage(7, [
 			event_new_game(0, 800, 600, ["Ala207", "Bob207"]),
@@ -316,6 +509,7 @@ class TestServer200(unittest.TestCase):
 		self.assertClientsReceived(self.clients[1:], expected_events)
 		self.assertEqual(self.clients[0].pull_events(), [])
 
+	@server_args(8)
 	def test_207(self):
 		"""
 		Parametry serwera: -v 2 -s 8 -w 800 -h 600
@@ -323,13 +517,11 @@ class TestServer200(unittest.TestCase):
 		Klient 1: turn_direction = 1, next_expected_event_no = 0, player_name = Ala208
 		Klient 2: turn_direction = 2, next_expected_event_no = 0, player_name = Bob208
 		"""
-		self.server = self.start_server(8)
 		self.clients = self.new_clients([" ", "Ala208", "Bob208"])
 
 		self.clients[0].send_message(1, 0)
 		self.clients[1].send_message(1, 0)
 		self.clients[2].send_message(2, 0)
-		self.wait_server()
 
 		expected_events = communication.ServerMessage(8, [
 			event_new_game(0, 800, 600, ["Ala208", "Bob208"]),
@@ -342,6 +534,7 @@ class TestServer200(unittest.TestCase):
 		self.assertClientsReceived(self.clients[1:], expected_events)
 		self.assertEqual(self.clients[0].pull_events(), [])
 
+	@server_args(9)
 	def test_208(self):
 		"""
 		Parametry serwera: -v 2 -s 9 -w 800 -h 600
@@ -349,13 +542,11 @@ class TestServer200(unittest.TestCase):
 		Klient 1: turn_direction = 1, next_expected_event_no = 0, player_name = Ala209
 		Klient 2: turn_direction = 2, next_expected_event_no = 0, player_name = Bob209
 		"""
-		self.server = self.start_server(9)
 		self.clients = self.new_clients(["\0", "Ala209", "Bob209"])
 
 		self.clients[0].send_message(2)
 		self.clients[1].send_message(1)
 		self.clients[2].send_message(2)
-		self.wait_server()
 
 		expected_events = communication.ServerMessage(9, [
 			event_new_game(0, 800, 600, ["Ala209", "Bob209"]),
@@ -368,6 +559,7 @@ class TestServer200(unittest.TestCase):
 		self.assertClientsReceived(self.clients[1:], expected_events)
 		self.assertEqual(self.clients[0].pull_events(), [])
 
+	@server_args(10)
 	def test_209(self):
 		"""
 		Parametry serwera: -v 2 -s 10 -w 800 -h 600
@@ -376,13 +568,11 @@ class TestServer200(unittest.TestCase):
 		Klient 2: turn_direction = 2, next_expected_event_no = 0, player_name = bob210
 		Błędna nazwa gracza – klient 0 wysyła za długą nazwę gracza (21 znaków).
 		"""
-		self.server = self.start_server(10)
 		self.clients = self.new_clients(["abcdefghijklmnopqrstu", "ala210", "bob210"])
 
 		self.clients[0].send_message(2)
 		self.clients[1].send_message(1)
 		self.clients[2].send_message(2)
-		self.wait_server()
 
 		expected_events = communication.ServerMessage(10, [
 			event_new_game(0, 800, 600, ["ala210", "bob210"]),
@@ -395,6 +585,7 @@ class TestServer200(unittest.TestCase):
 		self.assertClientsReceived(self.clients[1:], expected_events)
 		self.assertEqual(self.clients[0].pull_events(), [])
 
+	@server_args(11)
 	def test_210(self):
 		"""
 		Parametry serwera: -v 2 -s 11 -w 800 -h 600
@@ -402,13 +593,11 @@ class TestServer200(unittest.TestCase):
 		Klient 1: turn_direction = 1, next_expected_event_no = 0, player_name = Bob211, używa IPv6
 		Klient 0: turn_direction = 1, next_expected_event_no = 0, player_name = Ala211, używa IPv4
 		"""
-		self.server = self.start_server(11)
 		self.clients = [self.new_client("Ala211", socket.AF_INET), self.new_client("Bob211", socket.AF_INET6)]
 
 		self.clients[0].send_message(0)
 		self.clients[1].send_message(1)
 		self.clients[0].send_message(1)
-		self.wait_server()
 
 		expected_events = communication.ServerMessage(11, [
 			event_new_game(0, 800, 600, ["Ala211", "Bob211"]),
@@ -419,6 +608,7 @@ class TestServer200(unittest.TestCase):
 		])
 		self.assertClientsReceived(self.clients, expected_events)
 
+	@server_args(12)
 	def test_211(self):
 		"""
 		Parametry serwera: -v 2 -s 12 -w 800 -h 600
@@ -426,14 +616,10 @@ class TestServer200(unittest.TestCase):
 		Klient 1: turn_direction = 1, next_expected_event_no = 0, player_name = Bob212
 		Klient 0: turn_direction = 1, next_expected_event_no = 1, player_name = Ala212
 		"""
-		self.server = self.start_server(12)
 		self.clients = self.new_clients(["Ala212", "Bob212"])
 
 		self.clients[0].send_message(1, 0)
 		self.clients[1].send_message(1, 0)
-		time.sleep(1)
-		self.clients[0].send_message(1, 1)
-		time.sleep(1)
 
 		events = [
 			event_new_game(0, 800, 600, ["Ala212", "Bob212"]),
@@ -446,20 +632,32 @@ class TestServer200(unittest.TestCase):
 		]
 		expected_events = communication.ServerMessage(12, events)
 
-		c0_messages = self.clients[0].pull_events()
-		c1_messages = self.clients[1].pull_events()
+		# Request retransmission once events 1-4 were received.
+		c0_messages = self.wait_events(self.clients[0], communication.ServerMessage(12, events[:5]))
+		self.clients[0].send_message(1, 1)
+
+		update = index_new_events(index_events(c0_messages))
+
+		def duplicated(received):
+			index = update(received)
+			return all(index[communication.event_key(e)] >= 1 for e in events) and \
+				   all(index[communication.event_key(e)] >= 2 for e in events[1:5])
+
+		c0_messages += self.clients[0].pull_events_until(duplicated, config.getfloat("TESTS_200", "EVENTS_TIMEOUT"))
+		c1_messages = self.wait_events(self.clients[1], expected_events)
 
 		# Check for all messages.
 		self.assertContainsEvents(expected_events, c0_messages)
 		self.assertContainsEvents(expected_events, c1_messages)
 
 		# Check for duplicates in client0.
-		c0_events = get_events(c0_messages)
+		c0_index = index_events(c0_messages)
 
 		for dup_event in events[1:5]:
-			num = len(list(filter(lambda x: events_equal(dup_event, x), c0_events)))
+			num = c0_index[communication.event_key(dup_event)]
 			self.assertEqual(2, num, f"Event ({dup_event}) is not duplicated")
 
+	@server_args(13)
 	def test_212(self):
 		"""
 		Parametry serwera: -v 2 -s 13 -w 800 -h 600
@@ -472,13 +670,11 @@ class TestServer200(unittest.TestCase):
 		# this test probably does not makes sense with zero AFTER_MSG_WAIT
 		# because messages not always would be sent in the same order.
 
-		self.server = self.start_server(13)
 		self.clients = self.new_clients(["Alicja213", "Bolek213", "Cezary213"])
 
 		self.clients[0].send_message(1)
 		self.clients[1].send_message(1)
 		self.clients[2].send_message(1)
-		self.wait_server()
 
 		expected_events = communication.ServerMessage(13, [
 			event_new_game(0, 800, 600, ["Alicja213", "Bolek213"]),
@@ -490,6 +686,7 @@ class TestServer200(unittest.TestCase):
 
 		self.assertClientsReceived(self.clients, expected_events)
 
+	@server_args(14)
 	def test_213(self):
 		"""
 		Parametry serwera: -v 2 -s 14 -w 800 -h 600
@@ -497,12 +694,10 @@ class TestServer200(unittest.TestCase):
 		Klient 1: turn_direction = 2, next_expected_event_no = 0, player_name = abcdefghijklmnopqrst
 		Klient 1 wysyła nazwę gracza o maksymalnej długości (20 znaków).
 		"""
-		self.server = self.start_server(14)
 		self.clients = self.new_clients(["ala214", "abcdefghijklmnopqrst"])
 
 		self.clients[0].send_message(1)
 		self.clients[1].send_message(2)
-		self.wait_server()
 
 		expected_events = communication.ServerMessage(14, [
 			event_new_game(0, 800, 600, ["abcdefghijklmnopqrst", "ala214"]),
@@ -514,6 +709,7 @@ class TestServer200(unittest.TestCase):
 
 		self.assertClientsReceived(self.clients, expected_events)
 
+	@server_args(15)
 	def test_214(self):
 		"""
 		Parametry serwera: -v 2 -s 15 -w 800 -h 600
@@ -522,14 +718,13 @@ class TestServer200(unittest.TestCase):
 		Klient 1: turn_direction = 1, next_expected_event_no = 0, player_name = Bobek215
 		Klient 2: turn_direction = 1, next_expected_event_no = 0, player_name = Cezary215
 		"""
-		self.server = self.start_server(15)
 		self.clients = self.new_clients(["Ala215", "Bobek215", "Cezary215"])
 
 		self.clients[0].send_message(1)
+		# Not an event to wait for: server disconnects clients silent for 2 seconds.
 		time.sleep(3)
 		self.clients[1].send_message(1)
 		self.clients[2].send_message(1)
-		self.wait_server()
 
 		expected_events = communication.ServerMessage(15, [
 			event_new_game(0, 800, 600, ["Bobek215", "Cezary215"]),
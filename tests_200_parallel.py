@@ -0,0 +1,113 @@
+import argparse
+import multiprocessing
+import time
+import traceback
+import unittest
+import resource_sampler
+import tests_200
+
+
+class CollectingResult(unittest.TestResult):
+	"""
+	Test result made of plain, picklable (test id, outcome, details, duration, resources) tuples,
+	resources being the server resource summary or None.
+	"""
+
+	def __init__(self):
+		super().__init__()
+		self.records = []
+		self.test_start = 0.0
+
+	def startTest(self, test):
+		super().startTest(test)
+		self.test_start = time.monotonic()
+
+	def record(self, test, outcome, details=""):
+		self.records.append((test.id(), outcome, details, time.monotonic() - self.test_start,
+							 tests_200.resource_summaries.get(test.id())))
+
+	def addSuccess(self, test):
+		super().addSuccess(test)
+		self.record(test, "ok")
+
+	def addFailure(self, test, err):
+		super().addFailure(test, err)
+		self.record(test, "FAIL", "".join(traceback.format_exception(*err)))
+
+	def addError(self, test, err):
+		super().addError(test, err)
+		self.record(test, "ERROR", "".join(traceback.format_exception(*err)))
+
+	def addSkip(self, test, reason):
+		super().addSkip(test, reason)
+		self.record(test, "skipped", reason)
+
+
+def init_worker(config_path):
+	tests_200.config.read(config_path)
+
+
+def run_tests(test_names):
+	"""
+	Pre-spawn servers of all given tests at once, then run the tests one after another.
+	"""
+	for name in test_names:
+		args = getattr(tests_200.TestServer200, name).server_args
+		port = tests_200.server_port(name)
+		try:
+			spawn_time = time.monotonic()
+			tests_200.prespawned_servers[port] = (args, tests_200.start_server(port, args), spawn_time)
+		except OSError:
+			pass  # The test starts its server itself and reports the error.
+
+	result = CollectingResult()
+	for name in test_names:
+		tests_200.TestServer200(name).run(result)
+
+	for args, server, spawn_time in tests_200.prespawned_servers.values():
+		tests_200.stop_server(server)
+	tests_200.prespawned_servers.clear()
+
+	return result.records
+
+
+def init_parser():
+	parser = argparse.ArgumentParser()
+	parser.add_argument("-j", "--jobs", default=None, type=int, help="worker processes, one per test by default")
+	parser.add_argument("-c", "--config", default="test_config.ini")
+	parser.add_argument("tests", nargs="*", help="test names, e.g. test_201, all by default")
+
+	return parser
+
+
+if __name__ == '__main__':
+	args = init_parser().parse_args()
+
+	names = args.tests or unittest.TestLoader().getTestCaseNames(tests_200.TestServer200)
+	jobs = min(args.jobs or len(names), len(names))
+	chunks = [names[i::jobs] for i in range(jobs)]
+
+	start = time.monotonic()
+	with multiprocessing.Pool(jobs, initializer=init_worker, initargs=(args.config,)) as pool:
+		records = [r for chunk_records in pool.imap_unordered(run_tests, chunks) for r in chunk_records]
+	elapsed = time.monotonic() - start
+
+	records.sort(key=lambda r: r[0])
+	for test_id, outcome, details, duration, resources in records:
+		print(f"{test_id} ... {outcome} ({duration:.2f}s)")
+		if resources is not None:
+			print(f"    server: {resource_sampler.format_summary(resources)}")
+	for test_id, outcome, details, duration, resources in records:
+		if outcome in ("FAIL", "ERROR"):
+			print("=" * 70)
+			print(f"{outcome}: {test_id}")
+			print("-" * 70)
+			print(details)
+
+	failures = sum(1 for r in records if r[1] == "FAIL")
+	errors = sum(1 for r in records if r[1] == "ERROR")
+	print("-" * 70)
+	print(f"Ran {len(records)} tests in {elapsed:.3f}s with {jobs} workers "
+		  f"(sum of test durations {sum(r[3] for r in records):.3f}s)")
+	print("OK" if failures + errors == 0 else f"FAILED (failures={failures}, errors={errors})")
+	exit(0 if failures + errors == 0 else 1)
@@ -0,0 +1,106 @@
+import unittest
+from unittest import mock
+import board
+import communication
+from communication import event_new_game, event_pixel, event_player_eliminated, event_game_over
+
+
+def corrupted_game():
+	events = [
+		event_new_game(0, 10, 10, ["a", "b", "c"]),
+		event_pixel(1, 0, 1, 1),
+		event_pixel(2, 1, 2, 2),
+		event_pixel(4, 2, 3, 3),
+		event_pixel(5, 0, 1, 1),
+		event_pixel(5, 1, 12, 3),
+		event_pixel(6, 5, 4, 4),
+		event_player_eliminated(7, 1),
+		event_pixel(8, 1, 5, 5),
+		event_player_eliminated(9, 1),
+		event_player_eliminated(10, 7),
+		event_new_game(11, 10, 10, ["x"]),
+		event_game_over(12),
+		event_pixel(13, 0, 6, 6),
+		event_game_over(14),
+	]
+	return communication.EventBatch(events)
+
+
+class TestBoard(unittest.TestCase):
+	def validate_pure(self, batch):
+		with mock.patch.object(board, "numpy", None):
+			return board.validate_game(batch)
+
+	def test_consistent_game(self):
+		batch = communication.EventBatch([
+			event_new_game(0, 10, 10, ["a", "b"]),
+			event_pixel(1, 0, 1, 1),
+			event_pixel(2, 1, 2, 2),
+			event_player_eliminated(3, 1),
+			event_game_over(4),
+		])
+		self.assertEqual([], self.validate_pure(batch))
+		if board.numpy is not None:
+			self.assertEqual([], board.validate_game(batch))
+
+	def test_corrupted_game(self):
+		errors = self.validate_pure(corrupted_game())
+		self.assertEqual([
+			"event 4: expected event_no 3",
+			"event 5: PIXEL (1, 1) already eaten",
+			"event 5: expected event_no 6",
+			"event 5: PIXEL (12, 3) outside the board",
+			"event 6: PIXEL of unknown player 5",
+			"event 8: PIXEL of eliminated player 1",
+			"event 9: player 1 eliminated again",
+			"event 10: PLAYER_ELIMINATED of unknown player 7",
+			"event 11: unexpected event_type=0",
+			"event 12: GAME_OVER with 2 players left",
+			"event 13: event after GAME_OVER",
+			"event 14: event after GAME_OVER",
+			"event 14: GAME_OVER with 2 players left",
+		], errors)
+
+	def test_negative_pixel(self):
+		# GUI lines may carry any integer, a negative coordinate must not index occupied from the end.
+		game = board.Board(communication.DataNewGame(10, 10, ["a"]))
+		game.apply_pixel(1, 0, -1, 9)
+		game.apply_pixel(2, 0, 9, 9)
+		game.apply_pixel(3, 0, 0, -1)
+		self.assertEqual(["event 1: PIXEL (-1, 9) outside the board", "event 3: PIXEL (0, -1) outside the board"],
+						 game.errors)
+
+	def test_batch_without_new_game(self):
+		new_game = communication.DataNewGame(10, 10, ["a", "b"])
+		batch = communication.EventBatch([event_pixel(1, 0, 1, 1), event_pixel(2, 0, 1, 1)])
+		paths = [None] if board.numpy is None else [None, board.numpy]
+		for numpy in paths:
+			with self.subTest(numpy=numpy is not None), mock.patch.object(board, "numpy", numpy):
+				game = board.Board(new_game)
+				game.apply_batch(batch)
+				self.assertEqual(3, game.next_event_no)
+				self.assertEqual(["event 2: PIXEL (1, 1) already eaten"], game.errors)
+
+	@unittest.skipIf(board.numpy is None, "requires numpy")
+	def test_paths_agree(self):
+		batch = corrupted_game()
+		self.assertEqual(sorted(self.validate_pure(batch)), sorted(board.validate_game(batch)))
+
+	@unittest.skipIf(board.numpy is None, "requires numpy")
+	def test_paths_agree_incrementally(self):
+		batch = corrupted_game()
+		for split in range(1, len(batch)):
+			with self.subTest(split=split):
+				pure = board.Board(batch.new_games[0])
+				vectorized = board.Board(batch.new_games[0])
+				with mock.patch.object(board, "numpy", None):
+					pure.apply_batch(batch, 1, split)
+					pure.apply_batch(batch, split)
+				vectorized.apply_batch(batch, 1, split)
+				vectorized.apply_batch(batch, split)
+				self.assertEqual(sorted(self.validate_pure(batch)), sorted(pure.errors))
+				self.assertEqual(sorted(pure.errors), sorted(vectorized.errors))
+
+
+if __name__ == '__main__':
+	unittest.main()
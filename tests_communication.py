@@ -0,0 +1,178 @@
+import unittest
+import zlib
+import communication
+from communication import event_new_game, event_pixel, event_player_eliminated, event_game_over
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+
+def game_events(pixels=200):
+	"""
+	NEW_GAME of two players, pixels PIXEL events, an elimination and GAME_OVER.
+	"""
+	events = [event_new_game(0, 800, 600, ["Ala", "Bob"])]
+	events += [event_pixel(i, i % 2, i % 800, i % 600) for i in range(1, pixels + 1)]
+	events.append(event_player_eliminated(pixels + 1, 1))
+	events.append(event_game_over(pixels + 2))
+	return events
+
+
+def keys(events):
+	return [communication.event_key(e) for e in events]
+
+
+class TestStcEncoding(unittest.TestCase):
+	def test_serialize_round_trip(self):
+		events = game_events(10)
+		b_message = communication.serialize_stc_message(communication.ServerMessage(777, events))
+
+		for lazy in (False, True):
+			message = communication.deserialize_stc_message(b_message, strict=True, lazy=lazy)
+			self.assertEqual(777, message.game_id)
+			self.assertEqual(keys(events), keys(message.events))
+
+	def test_event_len_and_crc32(self):
+		events = game_events(1)
+		message = communication.deserialize_stc_message(
+			communication.serialize_stc_message(communication.ServerMessage(1, events)))
+
+		# event_len counts event_no, event_type and event_data.
+		self.assertEqual([5 + 8 + len(b"Ala\0Bob\0"), 5 + 9, 5 + 1, 5], [e.event_len for e in message.events])
+		b_message = communication.serialize_stc_message(communication.ServerMessage(1, events))
+		offset = 4
+		for e in message.events:
+			data_end = offset + 4 + e.event_len
+			self.assertEqual(zlib.crc32(b_message[offset:data_end]), e.crc32)
+			offset = data_end + 4
+		self.assertEqual(len(b_message), offset)
+
+	def test_pack_round_trip(self):
+		events = game_events(1000)
+		b_messages = communication.pack_stc_events(5, events)
+
+		self.assertGreater(len(b_messages), 1)
+		received = []
+		for b_message in b_messages:
+			self.assertLessEqual(len(b_message), communication.MAX_STC_MESSAGE_LEN)
+			message = communication.deserialize_stc_message(b_message, strict=True)
+			self.assertEqual(5, message.game_id)
+			received += message.events
+		self.assertEqual(keys(events), keys(received))
+
+	def test_pack_is_greedy(self):
+		# 22 bytes per PIXEL event, 24 of them fill 4 + 24 * 22 = 532 bytes, the 25th does not fit.
+		events = [event_pixel(i, 0, i, i) for i in range(1, 101)]
+		buffer = bytearray(communication.MAX_STC_MESSAGE_LEN)
+
+		length, n_events = communication.pack_stc_events_into(buffer, 5, events)
+		self.assertEqual((532, 24), (length, n_events))
+		length, n_events = communication.pack_stc_events_into(buffer, 5, events, n_events)
+		self.assertEqual((532, 48), (length, n_events))
+
+
+class TestEventBatch(unittest.TestCase):
+	def test_round_trip(self):
+		events = game_events(100)
+		batch = communication.EventBatch()
+		for b_message in communication.pack_stc_events(5, events):
+			batch.extend_from_message(b_message, strict=True)
+
+		self.assertEqual(len(events), len(batch))
+		self.assertEqual(keys(events), keys(batch.events()))
+		self.assertEqual(keys(events), keys(communication.EventBatch(events).events()))
+
+	def test_crc32_placeholder(self):
+		batch = communication.EventBatch([event_pixel(1, 0, 2, 3)])
+		self.assertEqual(0xFFFFFFFF, batch[0].crc32)
+
+	def test_append_failure(self):
+		batch = communication.EventBatch([event_pixel(1, 0, 2, 3)])
+		with self.assertRaises(OverflowError):
+			batch.append(event_pixel(2, 256, 2, 3))
+		self.assertEqual(1, len(batch))
+		self.assertEqual(1, len(batch.crc32))
+
+	@unittest.skipIf(numpy is None, "requires numpy")
+	def test_to_numpy(self):
+		events = game_events(10)
+		batch = communication.EventBatch(events)
+		columns = batch.to_numpy()
+
+		self.assertEqual([e.event_no for e in events], columns["event_no"].tolist())
+		self.assertEqual([e.event_type for e in events], columns["event_type"].tolist())
+		with self.assertRaises(BufferError):
+			batch.append(event_game_over(13))
+		del columns
+		batch.append(event_game_over(13))
+		self.assertEqual(len(events) + 1, len(batch))
+
+
+class TestStcValidation(unittest.TestCase):
+	def setUp(self):
+		# PIXEL events of 22 bytes after the 4 byte game_id.
+		self.b_message = communication.serialize_stc_message(
+			communication.ServerMessage(1, [event_pixel(1, 0, 2, 3), event_pixel(2, 1, 4, 5)]))
+
+	def assertInvalid(self, b_message, kind):
+		with self.assertRaises(communication.InvalidMessageError) as cm:
+			communication.deserialize_stc_message(b_message, strict=True)
+		self.assertEqual(kind, cm.exception.kind)
+		self.assertEqual(kind, communication.check_stc_message(b_message)[1].kind)
+
+	def test_valid(self):
+		self.assertEqual((2, None), communication.check_stc_message(self.b_message))
+
+	def test_crc32_mismatch(self):
+		b_message = bytearray(self.b_message)
+		b_message[-1] ^= 1
+		self.assertInvalid(b_message, communication.ERROR_CRC32)
+		self.assertEqual(1, communication.check_stc_message(b_message)[0])
+
+		# Not checked without strict.
+		self.assertEqual(2, len(communication.deserialize_stc_message(b_message).events))
+
+	def test_corrupted_data(self):
+		b_message = bytearray(self.b_message)
+		b_message[4 + 13] ^= 1
+		self.assertInvalid(b_message, communication.ERROR_CRC32)
+
+	def test_event_len_mismatch(self):
+		b_message = bytearray(self.b_message)
+		b_message[4 + 3] = 13
+		self.assertInvalid(b_message, communication.ERROR_LEN)
+
+	def test_event_len_exceeds_message(self):
+		b_message = bytearray(self.b_message)
+		b_message[4 + 2] = 1
+		self.assertInvalid(b_message, communication.ERROR_LEN)
+
+	def test_truncated_header(self):
+		self.assertInvalid(self.b_message + b"\0\0\0\x0e\0", communication.ERROR_LEN)
+		with self.assertRaises(communication.InvalidMessageError):
+			communication.EventBatch().extend_from_message(self.b_message + b"\0\0\0\x0e\0", strict=True)
+
+	def test_validate_stc_messages(self):
+		corrupted = bytearray(self.b_message)
+		corrupted[-1] ^= 1
+		report = communication.validate_stc_messages([self.b_message, corrupted, self.b_message[:-3]])
+
+		self.assertEqual((3, 1, 2), (report.datagrams, report.passed, report.failed))
+		self.assertEqual((1, 1), (report.len_errors, report.crc32_errors))
+		self.assertEqual([1, 2], [i for i, _ in report.errors])
+
+	def test_validate_stc_messages_max_errors(self):
+		corrupted = bytearray(self.b_message)
+		corrupted[-1] ^= 1
+		report = communication.ValidationReport(max_errors=2)
+		communication.validate_stc_messages([corrupted] * 3, report)
+		communication.validate_stc_messages([corrupted] * 3, report)
+
+		self.assertEqual((6, 6, 6), (report.datagrams, report.failed, report.crc32_errors))
+		self.assertEqual([0, 1], [i for i, _ in report.errors])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,62 @@
+import random
+import unittest
+import dummy_bot
+
+
+class TestBotSchedule(unittest.TestCase):
+	def count_sends(self, interval_s, tick_s, ticks, max_latency_s):
+		"""
+		Drive a bot with the shared timer ticks of run_bots, each handled up to max_latency_s late.
+		"""
+		bot = dummy_bot.Bot(None, 1, "bot", interval_s=interval_s)
+		rng = random.Random(1)
+		sends = 0
+		for i in range(ticks):
+			if bot.next_message(100.0 + i * tick_s + rng.uniform(0, max_latency_s), tick_s / 2) is not None:
+				bot.on_sent()
+				sends += 1
+		return sends
+
+	def test_jittered_ticks(self):
+		self.assertEqual(1000, self.count_sends(0.03, 0.03, 1000, 0.0005))
+
+	def test_late_ticks(self):
+		# Handling latency of almost half a tick still sends on every tick.
+		self.assertEqual(1000, self.count_sends(0.03, 0.03, 1000, 0.014))
+
+	def test_interval_longer_than_tick(self):
+		# 45ms behind a 30ms tick sends on two of three ticks, not every other one.
+		self.assertEqual(667, self.count_sends(0.045, 0.03, 1000, 0.0005))
+
+	def test_falls_behind(self):
+		bot = dummy_bot.Bot(None, 1, "bot", interval_s=0.03)
+		self.assertIsNotNone(bot.next_message(100.0))
+		self.assertIsNotNone(bot.next_message(101.0))
+		# Resynced after a stall, no burst of missed messages.
+		self.assertIsNone(bot.next_message(101.01))
+		self.assertIsNotNone(bot.next_message(101.03))
+
+
+class TestCreateBots(unittest.TestCase):
+	def names(self, *argv):
+		args = dummy_bot.init_parser().parse_args(["-a", "127.0.0.1", "-n", "bot", *argv])
+		bots, _ = dummy_bot.create_bots(args, False)
+		for bot in bots:
+			bot.sock.close()
+		return [bot.name for bot in bots]
+
+	def test_single_player(self):
+		self.assertEqual(["bot"], self.names("-b", "1"))
+
+	def test_single_observer(self):
+		self.assertEqual([""], self.names("-b", "0", "-o", "1"))
+
+	def test_one_player_with_observers(self):
+		self.assertEqual(["bot", "", ""], self.names("-b", "1", "-o", "2"))
+
+	def test_swarm(self):
+		self.assertEqual(["bot0", "bot1", ""], self.names("-b", "2", "-o", "1"))
+
+
+if __name__ == '__main__':
+	unittest.main()
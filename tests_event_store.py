@@ -0,0 +1,61 @@
+import unittest
+from communication import event_pixel
+from event_store import EventStore
+
+
+class TestEventStore(unittest.TestCase):
+	def add_all(self, store, event_nos):
+		delivered = []
+		for event_no in event_nos:
+			delivered += [e.event_no for e in store.add(event_pixel(event_no, 0, 0, 0))]
+		return delivered
+
+	def test_in_order(self):
+		store = EventStore()
+		self.assertEqual([0, 1, 2], self.add_all(store, [0, 1, 2]))
+		self.assertEqual((3, 0, 0, 0), (store.next_event_no, store.pending, store.out_of_order, store.lag()))
+
+	def test_reordering(self):
+		store = EventStore()
+		self.assertEqual([0], self.add_all(store, [0, 3, 2]))
+		self.assertEqual((2, 2, 3), (store.pending, store.out_of_order, store.lag()))
+		self.assertEqual([(1, 1)], store.gaps())
+
+		self.assertEqual([1, 2, 3], self.add_all(store, [1]))
+		self.assertEqual((4, 0, 0, []), (store.next_event_no, store.pending, store.lag(), store.gaps()))
+		self.assertEqual(2, store.out_of_order)
+
+	def test_duplicates(self):
+		store = EventStore()
+		self.assertEqual([0, 1], self.add_all(store, [0, 1, 0, 3, 3, 1]))
+		self.assertEqual(3, store.duplicates)
+		self.assertEqual(1, store.pending)
+		self.assertEqual(3, store.delivered + store.pending)
+
+	def test_reorder_window(self):
+		store = EventStore(reorder_window=4)
+		self.assertEqual([0], self.add_all(store, [0, 4, 5]))
+		self.assertEqual((1, 1), (store.pending, store.dropped))
+		self.assertIsNotNone(store.get(4))
+		self.assertIsNone(store.get(5))
+
+	def test_keep_log_and_reset(self):
+		store = EventStore(keep_log=True)
+		self.add_all(store, [1, 0])
+		self.assertEqual(1, store.get(1).event_no)
+
+		store.reset(7)
+		self.assertEqual((7, 0, 0, 0), (store.game_id, store.next_event_no, store.delivered, store.out_of_order))
+		self.assertIsNone(store.get(1))
+		self.assertEqual([0], self.add_all(store, [0]))
+
+	def test_out_of_order_is_per_game(self):
+		store = EventStore()
+		self.add_all(store, [0, 2, 1])
+		self.assertEqual(1, store.out_of_order)
+		store.reset(2)
+		self.assertEqual(0, store.out_of_order)
+
+
+if __name__ == '__main__':
+	unittest.main()
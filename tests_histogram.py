@@ -0,0 +1,64 @@
+import unittest
+from histogram import Histogram, SUB_BUCKET_BITS
+
+
+class TestHistogram(unittest.TestCase):
+	# Relative width of a bucket, percentiles are bucket upper bounds.
+	PRECISION = 2 ** -(SUB_BUCKET_BITS - 1)
+
+	def assertClose(self, expected, value):
+		self.assertLessEqual(expected, value)
+		self.assertLessEqual(value, expected * (1 + self.PRECISION))
+
+	def test_empty(self):
+		histogram = Histogram()
+		self.assertEqual((0.0, 0.0), (histogram.percentile(0.99), histogram.mean()))
+		self.assertEqual("n 0", str(histogram))
+
+	def test_percentiles(self):
+		histogram = Histogram()
+		for ms in range(1, 1001):
+			histogram.record(ms / 1000.0)
+
+		self.assertEqual(1000, histogram.count)
+		self.assertClose(0.5, histogram.percentile(0.5))
+		self.assertClose(0.99, histogram.percentile(0.99))
+		self.assertClose(0.999, histogram.percentile(0.999))
+		self.assertEqual(1.0, histogram.percentile(1.0))
+		self.assertAlmostEqual(0.5005, histogram.mean())
+
+	def test_small_values_are_exact(self):
+		histogram = Histogram()
+		for us in range(1, 101):
+			histogram.record(us / 1e6)
+		self.assertEqual(50e-6, histogram.percentile(0.5))
+		self.assertEqual(1e-6, histogram.percentile(0.0))
+
+	def test_max_value(self):
+		histogram = Histogram(max_s=1.0)
+		histogram.record(5.0)
+		histogram.record(-1.0)
+		self.assertEqual((0, 1000000), (histogram.min, histogram.max))
+		self.assertEqual(1.0, histogram.percentile(0.99))
+
+	def test_merge_and_reset(self):
+		low = Histogram()
+		high = Histogram()
+		for _ in range(90):
+			low.record(0.001)
+		for _ in range(10):
+			high.record(0.1)
+
+		low.merge(high)
+		low.merge(Histogram())
+		self.assertEqual((100, 1000, 100000), (low.count, low.min, low.max))
+		self.assertClose(0.001, low.percentile(0.9))
+		self.assertClose(0.1, low.percentile(0.91))
+
+		low.reset()
+		self.assertEqual((0, 0.0), (low.count, low.percentile(0.5)))
+		self.assertEqual(10, high.count)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+import argparse
+from typing import Dict, List
+import communication
+from capture import CaptureReader
+
+# Number of datagram fill ratio buckets, each 1 / FILL_BUCKETS of MAX_STC_MESSAGE_LEN wide.
+FILL_BUCKETS = 10
+
+
+class ClientWireStats:
+	"""
+	Packing efficiency of the datagrams received by one client.
+	Events are identified by (game_id, event_no), an event received again is a redundant retransmission.
+	Without a known round rate, rounds are counted as bursts of datagrams separated by more than burst_gap_s.
+	"""
+
+	def __init__(self, burst_gap_s=0.005):
+		self.burst_gap_s = burst_gap_s
+		self.datagrams = 0
+		self.bytes = 0
+		self.events = 0
+		self.redundant_events = 0
+		self.redundant_bytes = 0
+		self.fill = [0] * FILL_BUCKETS
+		self.seen = set()
+		self.bursts = 0
+		self.first_time = None
+		self.last_time = None
+
+	def add(self, b_message, t=None):
+		"""
+		:param t: receive time in seconds, used to count bursts
+		"""
+		message = communication.deserialize_stc_message(b_message, lazy=True)
+		self.datagrams += 1
+		self.bytes += len(b_message)
+		self.fill[min(FILL_BUCKETS - 1, len(b_message) * FILL_BUCKETS // communication.MAX_STC_MESSAGE_LEN)] += 1
+		for e in message.events:
+			self.events += 1
+			key = (message.game_id, e.event_no)
+			if key in self.seen:
+				self.redundant_events += 1
+				self.redundant_bytes += e.event_len + 8
+			else:
+				self.seen.add(key)
+
+		if t is not None:
+			if self.last_time is None or t - self.last_time > self.burst_gap_s:
+				self.bursts += 1
+			if self.first_time is None:
+				self.first_time = t
+			self.last_time = t
+
+	def rounds(self, rounds_per_sec=None) -> int:
+		if rounds_per_sec and self.first_time is not None:
+			return max(1, round((self.last_time - self.first_time) * rounds_per_sec))
+		return self.bursts
+
+	def summary(self, rounds_per_sec=None) -> dict:
+		rounds = self.rounds(rounds_per_sec)
+		return {
+			"datagrams": self.datagrams,
+			"bytes": self.bytes,
+			"events": self.events,
+			"fill_ratio": self.bytes / self.datagrams / communication.MAX_STC_MESSAGE_LEN if self.datagrams else 0.0,
+			"events_per_datagram": self.events / self.datagrams if self.datagrams else 0.0,
+			"redundant_events": self.redundant_events,
+			"redundant_bytes": self.redundant_bytes,
+			"rounds": rounds,
+			"bytes_per_round": self.bytes / rounds if rounds else 0.0,
+			"fill": list(self.fill),
+		}
+
+
+def format_summary(summary: dict) -> str:
+	redundant = summary["redundant_events"] / summary["events"] if summary["events"] else 0.0
+	return f"datagrams {summary['datagrams']} bytes {summary['bytes']} fill {summary['fill_ratio']:.1%} " \
+		   f"events/datagram {summary['events_per_datagram']:.1f} redundant events {summary['redundant_events']} " \
+		   f"({redundant:.1%}, {summary['redundant_bytes']} bytes) rounds {summary['rounds']} " \
+		   f"bytes/round {summary['bytes_per_round']:.0f}"
+
+
+def format_fill(fill: List[int]) -> str:
+	total = sum(fill)
+	width = 100 // FILL_BUCKETS
+	return " ".join(f"{i * width}-{(i + 1) * width}%:{c / total:.0%}" for i, c in enumerate(fill) if c) if total else ""
+
+
+def report(clients: Dict[str, ClientWireStats], rounds_per_sec=None) -> str:
+	"""
+	:param clients: client name -> its stats
+	:return: one line per client followed by totals over all clients
+	"""
+	lines = []
+	total = ClientWireStats()
+	total_rounds = 0
+	for name, stats in clients.items():
+		summary = stats.summary(rounds_per_sec)
+		lines.append(f"{name}: {format_summary(summary)}")
+		total.datagrams += stats.datagrams
+		total.bytes += stats.bytes
+		total.events += stats.events
+		total.redundant_events += stats.redundant_events
+		total.redundant_bytes += stats.redundant_bytes
+		total.fill = [a + b for a, b in zip(total.fill, stats.fill)]
+		total_rounds = max(total_rounds, summary["rounds"])
+
+	summary = total.summary()
+	if clients:
+		# Bytes per client per round, rounds taken from the client that saw the most.
+		summary["rounds"] = total_rounds
+		summary["bytes_per_round"] = total.bytes / len(clients) / total_rounds if total_rounds else 0.0
+	lines.append(f"all clients: {format_summary(summary)} (bytes/round per client)")
+	lines.append(f"fill ratio distribution: {format_fill(summary['fill'])}")
+	return "\n".join(lines)
+
+
+def analyze_captures(paths, rounds_per_sec=None, burst_gap_s=0.005) -> str:
+	clients = {}
+	for path in paths:
+		stats = ClientWireStats(burst_gap_s)
+		with CaptureReader(path) as reader:
+			for t, datagram in reader:
+				stats.add(datagram, t)
+		clients[path] = stats
+	return report(clients, rounds_per_sec)
+
+
+def init_parser():
+	parser = argparse.ArgumentParser(description="datagram packing efficiency of captured server traffic")
+	parser.add_argument("captures", nargs="+", help="capture files, one per client, see capture.py")
+	parser.add_argument("-v", "--rounds-per-sec", default=None, type=int,
+						help="server rounds per second, rounds are estimated from datagram bursts if not set")
+	parser.add_argument("-g", "--burst-gap", default=5.0, type=float,
+						help="gap [ms] between datagrams that starts a new round when estimating rounds")
+
+	return parser
+
+
+if __name__ == '__main__':
+	args = init_parser().parse_args()
+	print(analyze_captures(args.captures, args.rounds_per_sec, args.burst_gap / 1000.0))